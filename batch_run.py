@@ -0,0 +1,218 @@
+#!/usr/bin/python3 -Wignore
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from entity import get_entities_at_location
+from game_container import GameContainer
+from game_engine import GameEngine
+from game_states import GameStates
+from loader_functions.initialize_new_game import get_constants, get_game_variables
+from map_objects.navigation_map import CARDINAL_COST, DIAGONAL_COST, NEIGHBOURS
+import numpy as np
+import tcod as libtcod
+
+# Plays many seeded games at once with a scripted bot, without a window, and
+# writes how each one went to a CSV or JSON file. Run it from the game's directory:
+#     python3 batch_run.py --games 1000 --output runs.json
+
+class StairsBot:
+    # Walks to the stairs down and fights whatever stands next to it on the way.
+    # It knows the whole map, so it measures the game rather than plays it fairly.
+    def __init__(self, engine):
+        self.engine = engine
+        self.stairs = None
+        self.stairs_map = None
+
+    def get_stairs_map(self):
+        # distance to the stairs down from every tile, made again on every floor
+        entities = self.engine.entities
+        game_map = self.engine.game_map
+        for entity in entities.with_component("stairs"):
+            if entity.stairs.downwards:
+                break
+        else:
+            return None
+
+        if self.stairs is not entity:
+            self.stairs = entity
+            self.stairs_map = libtcod.path.maxarray((game_map.width, game_map.height), order="F")
+            self.stairs_map[entity.x, entity.y] = 0
+            libtcod.path.dijkstra2d(self.stairs_map, ~game_map.blocked, CARDINAL_COST, DIAGONAL_COST,
+                                    out=self.stairs_map)
+        return self.stairs_map
+
+    def get_action(self):
+        engine = self.engine
+        player = engine.player
+
+        if engine.game_state == GameStates.CHARACTER_CREATION:
+            return {"accept": True}
+        elif engine.game_state == GameStates.LEVEL_UP:
+            return {"level_up": "CON"}
+        elif engine.game_state != GameStates.PLAYERS_TURN:
+            return {"end": True}
+
+        for (dx, dy) in NEIGHBOURS:
+            for entity in get_entities_at_location(engine.entities, player.x + dx, player.y + dy):
+                if entity.ai and entity.fighter:
+                    return {"move": (dx, dy)}
+
+        stairs_map = self.get_stairs_map()
+        if stairs_map is None:
+            return {"wait": True}
+        if (player.x, player.y) == (self.stairs.x, self.stairs.y):
+            return {"descend_stairs": True}
+
+        # closed doors are walked into to open them, so only walls are in the way
+        best_step = None
+        best_distance = stairs_map[player.x, player.y]
+        for (dx, dy) in NEIGHBOURS:
+            distance = stairs_map[player.x + dx, player.y + dy]
+            if distance < best_distance:
+                best_step = (dx, dy)
+                best_distance = distance
+
+        if best_step is None:
+            return {"wait": True}
+        return {"move": best_step}
+
+def play_run(seed, max_turns):
+    # one game played by a StairsBot, until the player dies or max_turns pass
+    with tempfile.TemporaryDirectory() as floors_directory:
+        constants = get_constants()
+        constants['seed'] = seed
+        constants['floors_directory'] = floors_directory
+        # the pool already has a process on every core
+        constants['prepare_floors'] = False
+
+        player, entities, game_map, message_log, game_state, turn, identities = get_game_variables(constants)
+        game = GameContainer(lowest_level=1, high_score=0,
+                             stat_diffs=[0, 0, 0, 0, 0, 0], points_available=27)
+        engine = GameEngine(player, entities, game_map, turn, message_log,
+                            GameStates.CHARACTER_CREATION, constants, game, identities)
+        bot = StairsBot(engine)
+
+        steps = 0
+        start = time.perf_counter()
+        # the step limit stops a bot that got stuck somewhere turns don't pass
+        while (engine.turn <= max_turns and steps < max_turns * 10 and
+               engine.game_state != GameStates.PLAYER_DEAD):
+            engine.step(bot.get_action())
+            steps += 1
+        seconds = time.perf_counter() - start
+
+    death_cause = None
+    if engine.game_state == GameStates.PLAYER_DEAD:
+        # the message just before the one saying the player died, made the same
+        # for every game by leaving out the player's name and the numbers
+        messages = list(message_log.messages)
+        if len(messages) > 1:
+            death_cause = re.sub(r"\d+", "#", messages[-2].text.replace(player.name, "the player"))
+
+    run = {
+        "seed": seed,
+        "turns": engine.turn - 1,
+        "steps": steps,
+        "seconds": round(seconds, 3),
+        "turns_per_second": round((engine.turn - 1) / seconds, 1) if seconds > 0 else None,
+        "floors_reached": game_map.dungeon_level,
+        "player_level": player.level.current_level,
+        "dead": engine.game_state == GameStates.PLAYER_DEAD,
+        "death_cause": death_cause
+    }
+    for system, system_seconds in engine.profiler.totals.items():
+        run["{0}_seconds".format(system)] = round(system_seconds, 4)
+    return run
+
+def play_run_arguments(arguments):
+    return play_run(*arguments)
+
+def run_batch(seeds, max_turns, processes=None):
+    # runs come back in the order they finish, not the order of seeds
+    with multiprocessing.Pool(processes) as pool:
+        return list(pool.imap_unordered(play_run_arguments, [(seed, max_turns) for seed in seeds]))
+
+def get_summary(runs, seconds):
+    turns = sum(run["turns"] for run in runs)
+    floors = [run["floors_reached"] for run in runs]
+    death_causes = {}
+    for run in runs:
+        if run["dead"]:
+            death_causes[run["death_cause"]] = death_causes.get(run["death_cause"], 0) + 1
+
+    summary = {
+        "games": len(runs),
+        "seconds": round(seconds, 3),
+        "turns": turns,
+        "turns_per_second": round(turns / seconds, 1) if seconds > 0 else None,
+        "deaths": sum(run["dead"] for run in runs),
+        "mean_floors_reached": round(float(np.mean(floors)), 2) if floors else None,
+        "max_floors_reached": max(floors, default=None),
+        "death_causes": dict(sorted(death_causes.items(), key=lambda cause: -cause[1]))
+    }
+    # the share of the time spent playing each system took; systems that are part
+    # of others, like ai of enemies, are counted in both
+    systems = [key for key in runs[0] if key.endswith("_seconds")] if runs else []
+    played = sum(run["seconds"] for run in runs)
+    for system in systems:
+        summary[system] = round(sum(run[system] for run in runs), 3)
+        if played > 0:
+            summary[system.replace("_seconds", "_share")] = round(summary[system] / played, 3)
+    return summary
+
+def get_summary_filename(filename):
+    root, extension = os.path.splitext(filename)
+    return "{0}_summary{1}".format(root, extension)
+
+def write_runs(filename, runs, summary):
+    # A .csv file gets a row per game, and the summary goes next to it in a
+    # _summary.csv file with a row per figure; anything else gets both as JSON.
+    runs = sorted(runs, key=lambda run: run["seed"])
+    if filename.endswith(".csv"):
+        with open(filename, "w", newline="") as csv_file:
+            if runs:
+                writer = csv.DictWriter(csv_file, fieldnames=list(runs[0]))
+                writer.writeheader()
+                writer.writerows(runs)
+
+        with open(get_summary_filename(filename), "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["statistic", "value"])
+            for key, value in summary.items():
+                if key == "death_causes":
+                    for death_cause, deaths in value.items():
+                        writer.writerow(["death_cause: {0}".format(death_cause), deaths])
+                else:
+                    writer.writerow([key, value])
+    else:
+        with open(filename, "w") as json_file:
+            json.dump({"summary": summary, "runs": runs}, json_file, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many seeded games headlessly with a scripted bot.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--first-seed", type=int, default=0,
+                        help="games are played with the seeds from this one up")
+    parser.add_argument("--max-turns", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=None,
+                        help="defaults to one per core")
+    parser.add_argument("--output", default="batch_runs.json",
+                        help="a .csv file gets a row per game and a _summary.csv beside it, "
+                             "anything else JSON with a summary")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    runs = run_batch(range(args.first_seed, args.first_seed + args.games), args.max_turns, args.processes)
+    summary = get_summary(runs, time.perf_counter() - start)
+    write_runs(args.output, runs, summary)
+
+    for key, value in summary.items():
+        print("{0}: {1}".format(key, value))
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 import tcod as libtcod
 from entity import get_blocking_entities_at_location, get_entities_at_location
 from game_messages import Message
-from random import randint, random
+from random_utils import ai_random
 from rpg_mechanics import attack_success, get_modifier
 
 def check_for_traps(monster, entities, game_map, fov_map):
@@ -19,6 +19,11 @@ def check_for_traps(monster, entities, game_map, fov_map):
 
     return results
 
+def can_go_dormant(ai):
+    # Far from the player, AIs that can catch up on the turns they slept through
+    # with skip_turns are only run every few turns. Monsters hunting the player stay awake.
+    return hasattr(ai, "skip_turns") and not getattr(ai, "seeking", False)
+
 class BasicMonster:
     def __str__(self):
         return "Basic monster AI. Hunts closest target when in FOV."
@@ -32,12 +37,12 @@ class BasicMonster:
             if monster.distance_to(target) >= 2:
                 if not self.owner.fighter.is_effect("stuck"):
                     if target.fighter.is_effect("invisible"):
-                        random_x = self.owner.x + randint(0, 2) - 1
-                        random_y = self.owner.y + randint(0, 2) - 1
+                        random_x = self.owner.x + ai_random.randint(0, 2) - 1
+                        random_y = self.owner.y + ai_random.randint(0, 2) - 1
                         if random_x != self.owner.x and random_y != self.owner.y:
                             self.owner.move_towards(random_x, random_y, game_map, entities)
                     else:
-                        monster.move_astar(target, entities, game_map)
+                        monster.move_approach(target, entities, game_map)
 
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
 
@@ -46,14 +51,18 @@ class BasicMonster:
                 results.extend(attack_results)
         else:
             if not self.owner.fighter.is_effect("stuck"):
-                random_x = self.owner.x + randint(0, 2) - 1
-                random_y = self.owner.y + randint(0, 2) - 1
+                random_x = self.owner.x + ai_random.randint(0, 2) - 1
+                random_y = self.owner.y + ai_random.randint(0, 2) - 1
                 if not (random_x == self.owner.x and random_y == self.owner.y):
                     self.owner.move_towards(random_x, random_y, game_map, entities)
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
                     
         return results
 
+    def skip_turns(self, turns):
+        # out of sight, a basic monster only wanders around
+        pass
+
 class AggressiveMonster:
     def __init__(self, patience=20):
         self.max_patience = patience
@@ -73,12 +82,12 @@ class AggressiveMonster:
             if monster.distance_to(target) >= 2:
                 if not self.owner.fighter.is_effect("stuck"):
                     if target.fighter.is_effect("invisible"):
-                        random_x = monster.x + randint(0, 2) - 1
-                        random_y = monster.y + randint(0, 2) - 1
+                        random_x = monster.x + ai_random.randint(0, 2) - 1
+                        random_y = monster.y + ai_random.randint(0, 2) - 1
                         if random_x != self.owner.x and random_y != self.owner.y:
                             monster.move_towards(random_x, random_y, game_map, entities)
                     else:
-                        monster.move_astar(target, entities, game_map)
+                        monster.move_approach(target, entities, game_map)
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
             elif target.fighter.hp > 0:
                 attack_results = monster.fighter.attack(target)
@@ -89,7 +98,7 @@ class AggressiveMonster:
                 self.seeking = False
             if monster.distance_to(target) >= 2:
                 if not self.owner.fighter.is_effect("stuck"):
-                    monster.move_astar(target, entities, game_map)
+                    monster.move_approach(target, entities, game_map)
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
             elif target.fighter.hp > 0:
                 if self.current_patience < self.max_patience:
@@ -100,14 +109,18 @@ class AggressiveMonster:
             if self.current_patience < self.max_patience:
                     self.current_patience += 1
             if not monster.fighter.is_effect("stuck"):
-                random_x = monster.x + randint(0, 2) - 1
-                random_y = monster.y + randint(0, 2) - 1
+                random_x = monster.x + ai_random.randint(0, 2) - 1
+                random_y = monster.y + ai_random.randint(0, 2) - 1
                 if random_x != self.owner.x and random_y != self.owner.y:
                     monster.move_towards(random_x, random_y, game_map, entities)
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
                     
         return results
 
+    def skip_turns(self, turns):
+        # dormant monsters aren't seeking, so they only regain their patience
+        self.current_patience = min(self.max_patience, self.current_patience + turns)
+
 class IntelligentMonster:
     def __init__(self, patience=20, health_threshold=0.10, safe_range = 12):
         self.max_patience = patience
@@ -126,11 +139,11 @@ class IntelligentMonster:
         if (monster.fighter.hp / monster.fighter.max_hp) <= self.health_threshold:
             if not monster.fighter.is_effect("stuck"):
                 if monster.distance(target.x, target.y) < self.safe_range and not target.fighter.is_effect("invisible"):
-                    monster.flee_astar(target, entities, game_map, safe_range)
+                    monster.move_flee(target, entities, game_map, self.safe_range)
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
                 else:
-                    random_x = monster.x + randint(0, 2) - 1
-                    random_y = monster.y + randint(0, 2) - 1
+                    random_x = monster.x + ai_random.randint(0, 2) - 1
+                    random_y = monster.y + ai_random.randint(0, 2) - 1
                     if random_x != self.owner.x and random_y != self.owner.y:
                         monster.move_towards(random_x, random_y, game_map, entities)
                         results.extend(check_for_traps(monster, entities, game_map, fov_map))
@@ -141,12 +154,12 @@ class IntelligentMonster:
             if monster.distance_to(target) >= 2:
                 if not self.owner.fighter.is_effect("stuck"):
                     if target.fighter.is_effect("invisible"):
-                        random_x = monster.x + randint(0, 2) - 1
-                        random_y = monster.y + randint(0, 2) - 1
+                        random_x = monster.x + ai_random.randint(0, 2) - 1
+                        random_y = monster.y + ai_random.randint(0, 2) - 1
                         if random_x != self.owner.x and random_y != self.owner.y:
                             monster.move_towards(random_x, random_y, game_map, entities)
                     else:
-                        monster.move_astar(target, entities, game_map)
+                        monster.move_approach(target, entities, game_map)
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
             elif target.fighter.hp > 0:
                 attack_results = monster.fighter.attack(target)
@@ -157,7 +170,7 @@ class IntelligentMonster:
                 self.seeking = False
             if monster.distance_to(target) >= 2:
                 if not self.owner.fighter.is_effect("stuck"):
-                    monster.move_astar(target, entities, game_map)
+                    monster.move_approach(target, entities, game_map)
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
             elif target.fighter.hp > 0:
                 if self.current_patience < self.max_patience:
@@ -168,14 +181,19 @@ class IntelligentMonster:
             if self.current_patience < self.max_patience:
                     self.current_patience += 1
             if not monster.fighter.is_effect("stuck"):
-                random_x = monster.x + randint(0, 2) - 1
-                random_y = monster.y + randint(0, 2) - 1
+                random_x = monster.x + ai_random.randint(0, 2) - 1
+                random_y = monster.y + ai_random.randint(0, 2) - 1
                 if random_x != self.owner.x and random_y != self.owner.y:
                     monster.move_towards(random_x, random_y, game_map, entities)
                     results.extend(check_for_traps(monster, entities, game_map, fov_map))
                     
         return results
 
+    def skip_turns(self, turns):
+        # wounded monsters wander without regaining their patience
+        if (self.owner.fighter.hp / self.owner.fighter.max_hp) > self.health_threshold:
+            self.current_patience = min(self.max_patience, self.current_patience + turns)
+
 class ConfusedMonster:
     def __init__(self, previous_ai, number_of_turns=10):
         self.previous_ai = previous_ai
@@ -190,8 +208,8 @@ class ConfusedMonster:
 
         if self.number_of_turns > 0:
             if not monster.fighter.is_effect("stuck"):
-                random_x = monster.x + randint(0, 2) - 1
-                random_y = monster.y + randint(0, 2) - 1
+                random_x = monster.x + ai_random.randint(0, 2) - 1
+                random_y = monster.y + ai_random.randint(0, 2) - 1
 
                 if random_x != self.owner.x and random_y != self.owner.y:
                     self.owner.move_towards(random_x, random_y, game_map, entities)
@@ -204,6 +222,9 @@ class ConfusedMonster:
                                                libtcod.red)})
         return results
 
+    def skip_turns(self, turns):
+        self.number_of_turns = max(0, self.number_of_turns - turns)
+
 class DummyMonster:
     def __str__(self):
         return "Dummy monster AI. Does nothing."
@@ -211,6 +232,9 @@ class DummyMonster:
     def take_turn(self, target, fov_map, game_map, entities):
         return []
 
+    def skip_turns(self, turns):
+        pass
+
 class HardStoppedMonster:
     def __init__(self, previous_ai, number_of_turns=10, resume_text="stopped"):
         self.previous_ai = previous_ai
@@ -233,30 +257,43 @@ class HardStoppedMonster:
                 libtcod.red)})
         return results
 
+    def get_idle_turns(self):
+        return self.number_of_turns
+
+    def skip_turns(self, turns):
+        self.number_of_turns -= turns
+
 class SoftStoppedMonster:
     def __init__(self, previous_ai, number_of_turns=10, chance_to_resume=0.2, resume_text="stopped"):
         self.previous_ai = previous_ai
         self.number_of_turns = number_of_turns
         self.resume_text = resume_text
         self.chance_to_resume = chance_to_resume
-        self.first_turn = True
+        # The chances to resume are rolled up front, so the turn scheduler
+        # knows when to wake the monster up
+        self.turns_asleep = self.roll_turns_asleep()
 
     def __str__(self):
         return "Soft sttopped monster AI. Resumes previous AI after x turns, or with a chance to resume action."
 
+    def roll_turns_asleep(self):
+        # The first turn is always slept through, then there is a chance to
+        # resume on each of the next number_of_turns turns
+        turns = 1
+        remaining_turns = self.number_of_turns
+        while remaining_turns != 0:
+            remaining_turns -= 1
+            if ai_random.random() < self.chance_to_resume:
+                break
+            turns += 1
+        return turns
+
     def take_turn(self, target, fov_map, game_map, entities):
         results = []
         monster = self.owner
         
-        if self.first_turn:
-            self.first_turn = False
-        elif self.number_of_turns != 0:
-            self.number_of_turns -= 1
-            if random() < self.chance_to_resume:
-                monster.ai = self.previous_ai
-                results.append({'message': Message(
-                    'The {0} is no longer {1}!'.format(monster.name, self.resume_text),
-                    libtcod.red)})
+        if self.turns_asleep > 0:
+            self.turns_asleep -= 1
         else:
             monster.ai = self.previous_ai
             results.append({'message': Message(
@@ -265,6 +302,12 @@ class SoftStoppedMonster:
 
         return results
 
+    def get_idle_turns(self):
+        return self.turns_asleep
+
+    def skip_turns(self, turns):
+        self.turns_asleep -= turns
+
 class StaticMonster:
     def __str__(self):
         return "Statuc monster AI. Attacks nearby targets, but does not move."
@@ -321,11 +364,11 @@ class SourdoughAI(StaticMonster):
     def __init__(self, min_spread_time, max_spread_time):
         self.min_spread_time = min_spread_time
         self.max_spread_time = max_spread_time
-        self.turns_to_spawn = randint(min_spread_time, max_spread_time)
+        self.turns_to_spawn = ai_random.randint(min_spread_time, max_spread_time)
         self.mother = None
 
     def reroll(self):
-        self.turns_to_spawn = randint(self.min_spread_time, self.max_spread_time)
+        self.turns_to_spawn = ai_random.randint(self.min_spread_time, self.max_spread_time)
         
     def __str__(self):
         return "AI for the Sourdough Starter. Attacks nearby targets, and spreads sourdough starters more rarely than the mother dough."
@@ -376,13 +419,16 @@ class NeutralMonster:
         monster = self.owner
 
         if not self.owner.fighter.is_effect("stuck"):
-            random_x = self.owner.x + randint(0, 2) - 1
-            random_y = self.owner.y + randint(0, 2) - 1
+            random_x = self.owner.x + ai_random.randint(0, 2) - 1
+            random_y = self.owner.y + ai_random.randint(0, 2) - 1
             monster.move_towards(random_x, random_y, game_map, entities)
             results.extend(check_for_traps(monster, entities, game_map, fov_map))
                     
         return results
 
+    def skip_turns(self, turns):
+        pass
+
     def become_aggressive(self):
         results = []
         
@@ -1,39 +1,25 @@
-import datetime, time
 import tcod as libtcod
 
 class Animation:
+    # Frames are worked out from the frame clock, see FrameClock, so every
+    # animation on screen shares one time.monotonic() read per frame.
     def __init__(self, cycle_char=['X'], cycle_color=[libtcod.white], speed=1):
-        self.char_frame = 0
-        self.color_frame = 0
         self.cycle_char = cycle_char
         self.cycle_color = cycle_color
-        self.last_time = self.current_time
         self.speed = speed
+        self.frame = 0
 
-    def tick(self):
-        if self.current_time > self.last_time + self.speed:
-            if self.char_frame < len(self.cycle_char) - 1:
-                self.char_frame += 1
-            else:
-                self.char_frame = 0
-                
-            if self.color_frame < len(self.cycle_color) - 1:
-                self.color_frame += 1
-            else:
-                self.color_frame = 0
-                
-            self.last_time = self.current_time
+    def tick(self, frame_time):
+        # the number of speed-second steps since the clock started
+        self.frame = int(frame_time // self.speed)
+
+    def time_to_next_frame(self, frame_time):
+        return max(0, (self.frame + 1) * self.speed - frame_time)
 
     @property
     def get_char(self):
-        return self.cycle_char[self.char_frame]
+        return self.cycle_char[self.frame % len(self.cycle_char)]
 
     @property
     def get_color(self):
-        return self.cycle_color[self.color_frame]
-
-    @property
-    # current time in seconds
-    def current_time(self):
-        t = datetime.datetime.now()
-        return time.mktime(t.timetuple()) + (t.microsecond / 1000000)
+        return self.cycle_color[self.frame % len(self.cycle_color)]
@@ -1,4 +1,4 @@
-from random import randint
+from random_utils import loot_random
 
 class Chargeable:
     def __init__(self, max_charge, charge=0, times_recharged=0):
@@ -7,7 +7,7 @@ class Chargeable:
         self.times_recharged = times_recharged
 
     def init_charge(self):
-        self.charge = randint(self.max_charge / 2, self.max_charge)
+        self.charge = loot_random.randint(self.max_charge / 2, self.max_charge)
 
     def recharge(self, additional_charge):
         self.charge += additional_charge
@@ -1,4 +1,4 @@
-from random import choice
+from random_utils import combat_random
 from rpg_mechanics import die
 
 class Equipment:
@@ -29,7 +29,7 @@ class Equipment:
         if self.slots.get("main_hand") is None and self.slots.get("off_hand") is None:
             damage = die(1, 3)
         elif hasattr(self.owner, "attack_list"):
-            attack = choice(self.owner.attack_list)
+            attack = combat_random.choice(self.owner.attack_list)
             damage = die(attack.count, attack.side_count) + attack.enchantment
         else:
             if self.slots.get("main_hand") and self.slots.get("main_hand").equippable:
@@ -4,7 +4,7 @@ from components.valuable import Valuable
 from effect import Effect, EffectGroup
 from entity import Entity
 from game_messages import Message
-from random import choice, randint
+from random_utils import combat_random, loot_random
 from render_functions import RenderOrder
 from rpg_mechanics import attack_success, die, get_modifier
 
@@ -120,7 +120,7 @@ class Fighter:
             return 10 + get_modifier(self.dexterity)
 
     def select_attack(self):
-        return choice(self.attack_list)
+        return combat_random.choice(self.attack_list)
             
     def take_damage(self, amount):
         results = []
@@ -179,14 +179,14 @@ class Fighter:
         return results
 
     def get_gold(self):
-        gold = randint(0, self.max_gold_drop)
+        gold = loot_random.randint(0, self.max_gold_drop)
         
         if self.effects.get("golden"):
-            second_roll = randint(0, self.max_gold_drop)
+            second_roll = loot_random.randint(0, self.max_gold_drop)
             if second_roll > gold:
                 gold = second_roll
         else:   
-            gold = choice([0, 0, 0, gold]) # 1/4 chance of gold drop
+            gold = loot_random.choice([0, 0, 0, gold]) # 1/4 chance of gold drop
 
         if gold > 0:
             valuable_component = Valuable(gold)
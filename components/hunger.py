@@ -1,6 +1,6 @@
 from enum import Enum
 from game_messages import Message
-from random import choice
+from random_utils import misc_random
 
 class HungerType(Enum):
     MOVE = 0
@@ -33,7 +33,7 @@ class Hunger:
             if food_sat + self.saturation > self.maximum_saturation:
                 results.append({
                 'message': Message(
-                    choice([
+                    misc_random.choice([
                         "You're stuffed!", "You couldn't eat another bite!",
                         "Any more food would give you a really bad tummy ache!"
                     ])
@@ -1,7 +1,7 @@
 import tcod as libtcod
 from components.identity import identify_item_in_list
 from game_messages import Message
-from random import randint
+from random_utils import loot_random
 
 class Inventory:
     def __init__(self, capacity, gold_carried=0):
@@ -157,7 +157,7 @@ class Inventory:
         results = []
 
         if item.item.chargeable:
-            item.item.chargeable.recharge(randint(4, 8))
+            item.item.chargeable.recharge(loot_random.randint(4, 8))
             results.append({'item_charged': item, "consumed": True})
             if not self.owner.ai:
                 results.append({'message': Message('You charged the {0}.'.format(item.get_name),
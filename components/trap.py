@@ -1,7 +1,8 @@
 import tcod as libtcod
+from entity import get_entities_at_location
 from item_functions import poison, stuck, amnesia
 from game_messages import Message
-from random import randint
+from random_utils import combat_random, misc_random
 from rpg_mechanics import attack_success, die, get_modifier
 
 class Trap:
@@ -57,10 +58,10 @@ def teleport_trap(target, **kwargs):
     results = []
 
     while True:
-        x = randint(0, game_map.width - 1)
-        y = randint(0, game_map.height - 1)
+        x = misc_random.randint(0, game_map.width - 1)
+        y = misc_random.randint(0, game_map.height - 1)
 
-        if not game_map.is_blocked(x, y) and not any([entity for entity in entities if entity.x == x and entity.y == y]):
+        if not game_map.is_blocked(x, y) and not get_entities_at_location(entities, x, y):
             target.x = x
             target.y = y
             if not target.ai:
@@ -92,7 +93,7 @@ def bear_trap(target, **kwargs):
                 target.name.capitalize(), damage_taken), libtcod.white)})
     results.extend(target.fighter.take_damage(damage_taken))
 
-    turns_remaining = max(max(0, randint(20, 30) - target.fighter.dexterity), 1)
+    turns_remaining = max(max(0, combat_random.randint(20, 30) - target.fighter.dexterity), 1)
     
     results.extend(stuck(target, **{"turns": turns_remaining}))
 
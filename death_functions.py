@@ -4,7 +4,7 @@ from components.item import Item
 from game_messages import Message
 from game_states import GameStates
 from item_functions import heal
-from random import random
+from random_utils import loot_random
 from render_functions import RenderOrder
 
 def kill_player(player, game, identities):
@@ -40,7 +40,7 @@ def kill_monster(monster, fov_map):
         monster.name = 'remains of ' + monster.name
         monster.render_order = RenderOrder.CORPSE
     elif monster.id != "dummy":        
-        if random() < monster.fighter.chance_to_drop_corpse:
+        if loot_random.random() < monster.fighter.chance_to_drop_corpse:
             monster.char = '%'
             monster.color = libtcod.dark_red
             monster.blocks = False
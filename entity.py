@@ -1,7 +1,23 @@
-import tcod as libtcod
 import math
 from components.item import Item
 from render_functions import RenderOrder
+from turn_scheduler import TurnScheduler
+
+# components that EntityList keeps a registry of, see ComponentRegistry
+REGISTERED_COMPONENTS = ["ai", "fighter", "item", "inventory", "trap", "stairs", "light_source"]
+
+def component_property(name):
+    attribute = "_" + name
+
+    def getter(self):
+        return getattr(self, attribute)
+
+    def setter(self, value):
+        setattr(self, attribute, value)
+        if self.entity_list is not None:
+            self.entity_list.component_changed(self, name)
+
+    return property(getter, setter)
 
 class Entity:
     def __init__(self, id, x, y, char, color, name, weight=0, blocks=False,
@@ -11,14 +27,16 @@ class Entity:
                  animation=None, hunger=None, food=None, trap=None,
                  classification=[], sign=None, identity=None):
         self.id = id
-        self.x = x
-        self.y = y
+        # the EntityList this entity is on, which indexes it by position
+        self.entity_list = None
+        self._x = x
+        self._y = y
         self.char = char
         self.color = color
         self.name = name
         self.weight = weight
         self.blocks = blocks
-        self.render_order = render_order
+        self._render_order = render_order
         self.fighter = fighter
         self.ai = ai
         self.item = item
@@ -70,6 +88,19 @@ class Entity:
         if self.trap:
             self.trap.owner = self
 
+    fighter = component_property("fighter")
+    ai = component_property("ai")
+    item = component_property("item")
+    inventory = component_property("inventory")
+    stairs = component_property("stairs")
+    trap = component_property("trap")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # copies are not on any list; EntityList re-registers its own entities when loaded
+        state["entity_list"] = None
+        return state
+
     def __str__(self):
         return "Entity \'{0}\' is represented by {1} at location ({2}, {3}).".format(self.name, self.char, self.x, self.y)
 
@@ -91,9 +122,40 @@ class Entity:
             return self.identity.color
         return self.color
 
+    @property
+    def render_order(self):
+        return self._render_order
+
+    @render_order.setter
+    def render_order(self, value):
+        if self.entity_list is not None:
+            self.entity_list.render_layers.move(self, self._render_order, value)
+        self._render_order = value
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self.place(value, self._y)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self.place(self._x, value)
+
+    def place(self, x, y):
+        if self.entity_list is not None:
+            self.entity_list.positions.move(self, self._x, self._y, x, y)
+        self._x = x
+        self._y = y
+
     def move(self, dx, dy):
-        self.x += dx
-        self.y += dy
+        self.place(self._x + dx, self._y + dy)
 
     def move_towards(self, target_x, target_y, game_map, entities):
         dx = target_x - self.x
@@ -113,116 +175,214 @@ class Entity:
     def distance(self, x, y):
         return math.sqrt((x - self.x) ** 2 + (y - self.y) ** 2)
 
-    def move_astar(self, target, entities, game_map):
-        # Create a FOV map that has the dimensions of the map
-        fov = libtcod.map_new(game_map.width, game_map.height)
-        
-        # Scan the current map each turn and set all the walls as unwalkable
-        for y1 in range(game_map.height):
-            for x1 in range(game_map.width):
-                libtcod.map_set_properties(fov, x1, y1, not game_map.tiles[x1][y1].block_sight,
-                                           not game_map.tiles[x1][y1].blocked)
-
-        # Scan all the objects to see if there are objects that must be navigated around
-        # Check also that the object isn't self or the target (so that the start and the end points are free)
-        # The AI class handles the situation if self is next to the target so it will not use this A* function anyway
-        for entity in entities:
-            if entity.blocks and entity != self and entity != target:
-                # Set the tile as a wall so it must be navigated around
-                libtcod.map_set_properties(fov, entity.x, entity.y, True, False)
-
-        # Allocate a A* path
-        # The 1.41 is the normal diagonal cost of moving, it can be set as 0.0 if diagonal moves are prohibited
-        my_path = libtcod.path_new_using_map(fov, 1.41)
-
-        # Compute the path between self's coordinates and the target's coordinates
-        libtcod.path_compute(my_path, self.x, self.y, target.x, target.y)
-
-        # Check if the path exists, and in this case, also the path is shorter than 25 tiles
-        # The path size matters if you want the monster to use alternative longer paths (for
-        # example through other rooms) if for example the player is in a corridor
-        # It makes sense to keep path size relatively low to keep the monsters from running around
-        # the map if there's an alternative path really far away
-        if not libtcod.path_is_empty(my_path) and libtcod.path_size(my_path) < 25:
-            # Find the next coordinates in the computed full path
-            x, y = libtcod.path_walk(my_path, True)
-            if x or y:
-                # Set self's coordinates to the next path tile
-                self.x = x
-                self.y = y
-        else:
-            # Keep the old move function as a backup so that if there are no paths
-            # (for example another monster blocks a corridor)
-            # it will still try to move towards the player (closer to the corridor opening)
-            self.move_towards(target.x, target.y, game_map, entities)
+    def move_approach(self, target, entities, game_map):
+        # Step downhill on the distance map towards the target, which is shared by every
+        # monster hunting the same target this turn
+        navigation = game_map.get_navigation(entities)
+        step = navigation.approach_step(self, target, 25)
 
-            # Delete the path to free memory
-        libtcod.path_delete(my_path)
-
-    def flee_astar(self, predator, entities, game_map, safe_range):
-        target_locations = []
-        
-        fov = libtcod.map_new(game_map.width, game_map.height)
-        
-        for y1 in range(game_map.height):
-            for x1 in range(game_map.width):
-                libtcod.map_set_properties(fov, x1, y1, not game_map.tiles[x1][y1].block_sight,
-                                           not game_map.tiles[x1][y1].blocked)
-
-        for entity in entities:
-            if entity.blocks and entity != self and entity != predator:
-                libtcod.map_set_properties(fov, entity.x, entity.y, True, False)
-
-        my_path = libtcod.path_new_using_map(fov, 1.41)
-
-        # Compute the path between self's coordinates and the target's coordinates
-        libtcod.path_compute(my_path, self.x, self.y, target.x, target.y)
-
-        # Check if the path exists, and in this case, also the path is shorter than 25 tiles
-        # The path size matters if you want the monster to use alternative longer paths (for
-        # example through other rooms) if for example the player is in a corridor
-        # It makes sense to keep path size relatively low to keep the monsters from running around
-        # the map if there's an alternative path really far away
-        if not libtcod.path_is_empty(my_path) and libtcod.path_size(my_path) < 25:
-            # Find the next coordinates in the computed full path
-            x, y = libtcod.path_walk(my_path, True)
-            if x or y:
-                # Set self's coordinates to the next path tile
-                self.x = x
-                self.y = y
+        if step:
+            self.place(*step)
         else:
-            # Keep the old move function as a backup so that if there are no paths
-            # (for example another monster blocks a corridor)
-            # it will still try to move towards the player (closer to the corridor opening)
+            # No path short enough, for example another monster blocks a corridor, so
+            # at least try to get closer to the corridor opening
             self.move_towards(target.x, target.y, game_map, entities)
 
-            # Delete the path to free memory
-        libtcod.path_delete(my_path)
-
-
-
-
-
-
-
-
-
-
+    def move_flee(self, predator, entities, game_map, safe_range):
+        # Step downhill on the safety map shared by every monster fleeing the same predator
+        # this turn. Monsters that are cornered, or already safe_range steps away, stay put
+        navigation = game_map.get_navigation(entities)
+        step = navigation.flee_step(self, predator, safe_range)
 
+        if step:
+            self.place(*step)
 
+    def distance_to(self, other):
+        dx = other.x - self.x
+        dy = other.y - self.y
+        return math.sqrt((dx ** 2) + (dy ** 2))
 
+class EntityIndex:
+    # Entities bucketed by (x, y), so looking up a tile doesn't scan every entity
+    def __init__(self):
+        self.cells = {}
+
+    def add(self, entity):
+        self.cells.setdefault((entity.x, entity.y), []).append(entity)
+
+    def remove(self, entity):
+        self.discard(entity, entity.x, entity.y)
+
+    def discard(self, entity, x, y):
+        cell = self.cells.get((x, y))
+        if cell and entity in cell:
+            cell.remove(entity)
+            if not cell:
+                del self.cells[(x, y)]
+
+    def move(self, entity, old_x, old_y, x, y):
+        if (old_x, old_y) != (x, y):
+            self.discard(entity, old_x, old_y)
+            self.cells.setdefault((x, y), []).append(entity)
+
+    def get(self, x, y):
+        return self.cells.get((x, y), [])
+
+class ComponentRegistry:
+    # The entities that have each of REGISTERED_COMPONENTS. Dicts are used as
+    # ordered sets so that systems still visit entities in the order they were added.
+    def __init__(self):
+        self.entities = {name: {} for name in REGISTERED_COMPONENTS}
+
+    def has_component(self, entity, name):
+        if name == "light_source":
+            return entity.item is not None and entity.item.light_source is not None
+        return getattr(entity, name) is not None
+
+    def update(self, entity, name):
+        if self.has_component(entity, name):
+            self.entities[name].setdefault(entity)
+        else:
+            self.entities[name].pop(entity, None)
+
+    def add(self, entity):
+        for name in REGISTERED_COMPONENTS:
+            self.update(entity, name)
+
+    def remove(self, entity):
+        for name in REGISTERED_COMPONENTS:
+            self.entities[name].pop(entity, None)
+
+    def get(self, name):
+        return list(self.entities[name])
+
+class RenderLayers:
+    # Entities bucketed by RenderOrder, so drawing them in order doesn't sort every
+    # entity each frame. Entities in a layer are kept in the order they joined it.
+    def __init__(self):
+        self.layers = {}
+
+    def add(self, entity):
+        self.layers.setdefault(entity.render_order, {})[entity] = None
+
+    def remove(self, entity):
+        self.layers.get(entity.render_order, {}).pop(entity, None)
+
+    def move(self, entity, old_render_order, render_order):
+        if old_render_order != render_order:
+            self.layers.get(old_render_order, {}).pop(entity, None)
+            self.layers.setdefault(render_order, {})[entity] = None
+
+    def __iter__(self):
+        for render_order in sorted(self.layers, key=lambda x: x.value):
+            yield from self.layers[render_order]
+
+class EntityList(list):
+    # A list of the entities on a floor that keeps an EntityIndex, a
+    # ComponentRegistry, its RenderLayers and the TurnScheduler of its monsters up
+    # to date as entities are added, removed, moved and have their components swapped.
+    def __init__(self, entities=()):
+        super().__init__()
+        self.positions = EntityIndex()
+        self.components = ComponentRegistry()
+        self.render_layers = RenderLayers()
+        self.scheduler = TurnScheduler()
+        self.extend(entities)
+
+    def __reduce__(self):
+        # the scheduler is saved so that idle monsters don't lose track of their turns
+        return (EntityList, (list(self),), {"scheduler": self.scheduler})
+
+    def register(self, entity):
+        entity.entity_list = self
+        self.positions.add(entity)
+        self.components.add(entity)
+        self.render_layers.add(entity)
+        if entity.ai:
+            self.scheduler.add(entity)
+
+    def unregister(self, entity):
+        if entity.entity_list is self:
+            entity.entity_list = None
+        self.positions.remove(entity)
+        self.components.remove(entity)
+        self.render_layers.remove(entity)
+        self.scheduler.remove(entity)
+
+    def component_changed(self, entity, name):
+        self.components.update(entity, name)
+        if name == "item":
+            self.components.update(entity, "light_source")
+        elif name == "ai":
+            if entity.ai:
+                self.scheduler.add(entity)
+                self.scheduler.wake(entity)
+            else:
+                self.scheduler.remove(entity)
 
+    def append(self, entity):
+        super().append(entity)
+        self.register(entity)
 
+    def extend(self, entities):
+        for entity in entities:
+            self.append(entity)
+
+    def __iadd__(self, entities):
+        self.extend(entities)
+        return self
+
+    def insert(self, i, entity):
+        super().insert(i, entity)
+        self.register(entity)
+
+    def remove(self, entity):
+        super().remove(entity)
+        self.unregister(entity)
+
+    def pop(self, i=-1):
+        entity = super().pop(i)
+        self.unregister(entity)
+        return entity
+
+    def clear(self):
+        for entity in self:
+            self.unregister(entity)
+        super().clear()
+
+    def __delitem__(self, i):
+        removed = self[i] if isinstance(i, slice) else [self[i]]
+        super().__delitem__(i)
+        for entity in removed:
+            self.unregister(entity)
+
+    def __setitem__(self, i, entity):
+        if isinstance(i, slice):
+            removed = self[i]
+            added = list(entity)
+            super().__setitem__(i, added)
+        else:
+            removed = [self[i]]
+            added = [entity]
+            super().__setitem__(i, entity)
+        for old_entity in removed:
+            self.unregister(old_entity)
+        for new_entity in added:
+            self.register(new_entity)
 
+    def at_location(self, x, y):
+        return list(self.positions.get(x, y))
 
-        
+    def with_component(self, name):
+        return self.components.get(name)
 
-    def distance_to(self, other):
-        dx = other.x - self.x
-        dy = other.y - self.y
-        return math.sqrt((dx ** 2) + (dy ** 2))
+    def in_render_order(self):
+        return iter(self.render_layers)
 
 def get_blocking_entities_at_location(entities, destination_x, destination_y):
+    if isinstance(entities, EntityList):
+        entities = entities.positions.get(destination_x, destination_y)
+
     for entity in entities:
         if entity.blocks and entity.x == destination_x and entity.y == destination_y:
             if entity.fighter:
@@ -235,6 +395,9 @@ def get_blocking_entities_at_location(entities, destination_x, destination_y):
     return None
 
 def get_entities_at_location(entities, destination_x, destination_y):
+    if isinstance(entities, EntityList):
+        return entities.at_location(destination_x, destination_y)
+
     found_entities = []
     
     for entity in entities:
@@ -242,3 +405,11 @@ def get_entities_at_location(entities, destination_x, destination_y):
             found_entities.append(entity)
         
     return found_entities
+
+def get_entities_with_component(entities, component_name):
+    if isinstance(entities, EntityList):
+        return entities.with_component(component_name)
+
+    if component_name == "light_source":
+        return [entity for entity in entities if entity.item and entity.item.light_source]
+    return [entity for entity in entities if getattr(entity, component_name)]
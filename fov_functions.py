@@ -3,12 +3,16 @@ import tcod as libtcod
 def initialize_fov(game_map):
     fov_map = libtcod.map_new(game_map.width, game_map.height)
 
-    for y in range(game_map.height):
-        for x in range(game_map.width):
-            libtcod.map_set_properties(fov_map, x, y, not game_map.tiles[x][y].block_sight,
-                                       not game_map.tiles[x][y].blocked)
-            
+    # the tcod map is indexed [y, x], the tile arrays [x, y]
+    fov_map.transparent[...] = ~game_map.block_sight.T
+    fov_map.walkable[...] = ~game_map.blocked.T
+
     return fov_map
 
+def update_fov_cells(fov_map, game_map, changed_cells):
+    for (x, y) in changed_cells:
+        fov_map.transparent[y, x] = not game_map.block_sight[x, y]
+        fov_map.walkable[y, x] = not game_map.blocked[x, y]
+
 def recompute_fov(fov_map, x, y, radius, light_walls=True, algorithm=0):
     libtcod.map_compute_fov(fov_map, x, y, radius, light_walls, algorithm)
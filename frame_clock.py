@@ -0,0 +1,58 @@
+import time
+
+# the longest the main loop sleeps waiting for input when nothing is due
+MAX_SLEEP = 0.5
+
+class FrameClock:
+    # Paces the main loop. A frame is only drawn when the game state changed or an
+    # animation is due to show its next frame, and at most frame_cap times per
+    # second. In between, the loop sleeps until input arrives or the next frame is due.
+    def __init__(self, frame_cap):
+        self.frame_length = 1 / frame_cap
+        self.last_frame = None
+        self.next_animation = None
+        self.dirty = True
+        # the clock is read once per frame, and that time is shared by every animation
+        self.frame_time = time.monotonic()
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def get_next_frame(self):
+        # when the next frame should be drawn, or None if nothing needs drawing
+        if self.last_frame is None:
+            return time.monotonic()
+
+        if self.dirty:
+            next_frame = self.last_frame
+        elif self.next_animation is not None:
+            next_frame = self.next_animation
+        else:
+            return None
+
+        return max(next_frame, self.last_frame + self.frame_length)
+
+    def frame_due(self):
+        next_frame = self.get_next_frame()
+        self.frame_time = time.monotonic()
+        return next_frame is not None and self.frame_time >= next_frame
+
+    def frame_drawn(self, animation_delay=None):
+        # animation_delay is how long until an animation on screen changes frame
+        self.last_frame = self.frame_time
+        self.dirty = False
+        if animation_delay is None:
+            self.next_animation = None
+        else:
+            self.next_animation = self.last_frame + animation_delay
+
+    def get_timeout(self, busy=False):
+        # how long the loop can wait for input; busy loops, like enemy turns and
+        # resting, don't wait at all
+        if busy:
+            return 0
+
+        next_frame = self.get_next_frame()
+        if next_frame is None:
+            return MAX_SLEEP
+        return min(MAX_SLEEP, max(0, next_frame - time.monotonic()))
@@ -0,0 +1,1099 @@
+import datetime
+import time
+import tcod as libtcod
+from components.ai import can_go_dormant
+from components.animation import Animation
+from components.chargeable import Chargeable
+from components.food import Food
+from components.hunger import HungerType
+from components.identity import identify_item_in_list
+from components.item import Item
+from death_functions import kill_monster, kill_player
+from entity import get_blocking_entities_at_location, Entity, get_entities_at_location, get_entities_with_component
+from fov_functions import initialize_fov, recompute_fov, update_fov_cells
+from game_messages import Message, SCROLLBACK_HEIGHT
+from game_states import GameStates
+from loader_functions.entity_definitions import get_monster, get_item
+from menu_cursor import MenuCursor
+from plot_gen import Plot
+from profiler import Profiler
+from random_utils import misc_random, seed_streams
+from rpg_mechanics import get_modifier, attack_success
+
+max_points_available = 27
+
+class GameEngine:
+    # The game without a window. step plays out one action dict, as made by
+    # handle_keys and handle_mouse, and returns the results of it; nothing here
+    # draws or waits for input. Observers, like the renderer, are told about the
+    # results of every step.
+    def __init__(self, player, entities, game_map, turn, message_log, game_state, constants, game, identities):
+        self.player = player
+        self.entities = entities
+        self.game_map = game_map
+        self.turn = turn
+        self.message_log = message_log
+        self.game_state = game_state
+        self.previous_game_state = game_state
+        self.constants = constants
+        self.game = game
+        self.identities = identities
+        self.observers = []
+        self.profiler = Profiler()
+
+        if hasattr(player, "plot"):
+            self.plot = player.plot
+        else:
+            self.plot = Plot()
+            player.plot = self.plot
+            player.name = self.plot.protagonist.name
+
+        self.key_cursor = Entity("cursor", player.x, player.y, chr(0), libtcod.white, "Cursor",
+                                 animation=Animation(cycle_char=['X', ' '], speed=0.2))
+        self.player_light_sources = []
+        self.targeting_item = None
+        self.search_count = 0
+        self.debug_show_fov = False
+
+        self.creation_menu_cursor = MenuCursor(max_index=[5, 5])
+        self.stat_boosts = [[3, 4], [2, 5], [1, 2], [6, 3], [5, 6], [4, 1]]
+        # This could be coded better
+        # s_b[x] selects inspiration, s_b[x][0 to 1] major and minor boost
+        # self       provides +2 CON, +1 INT
+        # love       provides +2 DEX, +1 WIS
+        # peace      provides +2 STR, +1 DEX
+        # prosperity provides +2 CHA, +1 CON
+        # the arts   provides +2 WIS, +1 CHA
+        # the stars  provides +2 INT, +1 STR
+
+        # fov_recompute is set whenever the FOV changed, until a renderer has drawn it
+        self.fov_map = None
+        self.refresh_fov(True)
+
+        # the floor below is made in the background while this one is explored
+        game_map.prepare_next_floor(constants)
+        seed_streams(game_map.seed, turn)
+
+    def get_save_variables(self):
+        # in the order save_game and load_game use
+        return (self.player, self.entities, self.game_map, self.message_log,
+                self.game_state, self.turn, self.identities)
+
+    def refresh_fov(self, rebuild=False):
+        # rebuild when the map itself changed, not only what the player can see of it
+        start = time.perf_counter()
+        if rebuild:
+            self.fov_map = initialize_fov(self.game_map)
+        recompute_fov(self.fov_map, self.player.x, self.player.y,
+                      self.game_map.brightness + get_light(self.player_light_sources),
+                      self.constants['fov_light_walls'], self.constants['fov_algorithm'])
+        self.fov_recompute = True
+        self.profiler.add("fov", start)
+
+    @property
+    def busy(self):
+        # monsters are taking turns or the player is resting, which carries on
+        # with empty actions until it's the player's turn again
+        return self.game_state in (GameStates.ENEMY_TURN, GameStates.RESTING)
+
+    def set_game_state(self, game_state):
+        self.previous_game_state = self.game_state
+        self.game_state = game_state
+
+    def step(self, action):
+        start = time.perf_counter()
+        player_turn_results = []
+
+        if self.game_state == GameStates.PLAYERS_TURN:
+            player_turn_results.extend(self.take_player_turn(action))
+
+        exit_results = self.take_menu_action(action, player_turn_results)
+        if exit_results:
+            if action:
+                self.profiler.add("player", start)
+            return exit_results
+
+        if self.game_state == GameStates.CHARACTER_CREATION:
+            player_turn_results.extend(self.create_character(action))
+
+        results = self.process_player_results(player_turn_results)
+        # steps with no action, like waking up without input or busy turns, aren't
+        # the player's doing and would swamp the times of the ones that are
+        if action:
+            self.profiler.add("player", start)
+
+        if self.busy:
+            results.extend(self.take_enemy_turn())
+
+        for observer in self.observers:
+            observer.notify(self, results)
+
+        return results
+
+    def take_player_turn(self, action):
+        player = self.player
+        entities = self.entities
+        game_map = self.game_map
+        message_log = self.message_log
+        results = []
+
+        move = action.get('move')
+        wait = action.get('wait')
+        search = action.get("search")
+        pickup = action.get('pickup')
+        descend_stairs = action.get('descend_stairs')
+        ascend_stairs = action.get('ascend_stairs')
+        butcher = action.get("butcher")
+        rest = action.get("rest")
+        wizard_mode = action.get("wizard_mode")
+
+        if move:
+            dx, dy = move
+            destination_x = player.x + dx
+            destination_y = player.y + dy
+
+            if not game_map.is_blocked(destination_x, destination_y):
+                target = get_blocking_entities_at_location(entities, destination_x, destination_y)
+                if target:
+                    if target.door:
+                        if not target.door.ajar:
+                            target.door.open_door(game_map.tiles[destination_x][destination_y])
+                            results.extend(player.hunger.tick(HungerType.EXERT))
+
+                            update_fov_cells(self.fov_map, game_map, [(destination_x, destination_y)])
+                            self.refresh_fov()
+                    else:
+                        attack_results = player.fighter.attack(target)
+                        results.extend(player.hunger.tick(HungerType.EXERT))
+                        results.extend(attack_results)
+                else:
+                    if player.fighter.is_effect("stuck"):
+                        message_log.add_message(Message("You are stuck!", libtcod.yellow))
+                    else:
+                        player.move(dx, dy)
+                        results.extend(player.hunger.tick(HungerType.MOVE))
+                        self.search_count = 0
+
+                        entities_in_loc = get_entities_at_location(entities, destination_x, destination_y)
+                        items_in_loc = []
+                        for e in entities_in_loc:
+                            if e.sign:
+                                message_log.add_message(Message("The sign says, \"" + e.sign.text + "\"", libtcod.white))
+                            if e.trap and attack_success(get_modifier(player.fighter.dexterity), 10):
+                                e.trap.set_reveal(True)
+                                results.extend(e.trap.trap_function(player, **{"game_map": game_map, "entities": entities, "fov_map": self.fov_map}))
+                            if e.item:
+                                items_in_loc.append(e.get_name)
+                        if len(items_in_loc) == 1:
+                            message_log.add_message(Message("You see here " + items_in_loc[0] + ".", libtcod.white))
+                        elif len(items_in_loc) > 1:
+                            temp_str = "You see here "
+                            for i in range(len(items_in_loc) - 1):
+                                temp_str += items_in_loc[i] + ", "
+                                temp_str += items_in_loc[len(items_in_loc) - 1] + "."
+                                message_log.add_message(Message(temp_str, libtcod.white))
+
+                        self.refresh_fov()
+
+                self.set_game_state(GameStates.ENEMY_TURN)
+
+        elif wait:
+            results.extend(player.hunger.tick(HungerType.STATIC))
+            self.set_game_state(GameStates.ENEMY_TURN)
+
+        elif wizard_mode and not hasattr(player, "wizard_mode"):
+            # whoever is playing has to confirm it with a wizard_mode_confirmed action
+            results.append({"confirm_wizard_mode": True})
+
+        elif action.get("wizard_mode_confirmed") and not hasattr(player, "wizard_mode"):
+            self.enable_wizard_mode()
+
+        elif search:
+            results.extend(player.hunger.tick(HungerType.EXERT))
+            if self.search_count == 8:
+                message_log.add_message(Message("You can find nothing else here.", libtcod.yellow))
+            elif self.search_count == 7 or player.fighter.is_effect("dowsing"):
+                self.search_count = 8
+                search_surrounding_tiles(player, entities, True)
+            else:
+                search_surrounding_tiles(player, entities, False)
+                self.search_count += 1
+
+        elif pickup:
+            pickup_results = []
+
+            for entity in get_entities_at_location(entities, player.x, player.y):
+                if entity.item or entity.valuable:
+                    if entity.x == player.x and entity.y == player.y:
+                        pickup_results.extend(player.inventory.add_item(entity))
+
+            if len(pickup_results) > 0:
+                results.extend(pickup_results)
+                results.extend(player.hunger.tick(HungerType.MOVE))
+            else:
+                message_log.add_message(Message('There is nothing here to pickup.', libtcod.yellow))
+
+        elif descend_stairs:
+            for entity in get_entities_at_location(entities, player.x, player.y):
+                if entity.stairs and entity.x == player.x and entity.y == player.y:
+                    if not entity.stairs.downwards:
+                        message_log.add_message(Message('These stairs go up!', libtcod.yellow))
+                    else:
+                        if game_map.dungeon_level + 1 > game_map.lowest_level:
+                            results.append({'dead': player})
+                            break
+                        else:
+                            results.extend(self.change_floor(True))
+                            results.extend(player.hunger.tick(HungerType.EXERT))
+                            break
+                elif entity.trap and entity.trap.revealed and entity.trap.trap_function.__name__ == "hole_trap" and entity.x == player.x and entity.y == player.y:
+                    results.append({"downwards_exit": True})
+
+            else:
+                message_log.add_message(Message('There are no stairs here!', libtcod.yellow))
+
+        elif ascend_stairs:
+            for entity in get_entities_at_location(entities, player.x, player.y):
+                if entity.stairs and entity.x == player.x and entity.y == player.y:
+                    if entity.stairs.downwards:
+                        message_log.add_message(Message('These stairs go down!', libtcod.yellow))
+                    else:
+                        if game_map.dungeon_level - 1 <= 0:
+                            results.append({'dead': player})
+                            break
+                        else:
+                            results.extend(self.change_floor(False))
+                            results.extend(player.hunger.tick(HungerType.EXERT))
+                            break
+            else:
+                message_log.add_message(Message('There are no stairs here!', libtcod.yellow))
+
+        elif butcher:
+            for e in get_entities_at_location(entities, player.x, player.y):
+                if "corpse" in e.classification:
+                    item = Entity("flesh_of_" + e.id, e.x, e.y, "%", e.color,
+                                  e.name[11:] + " flesh", weight=1,
+                                  item=Item(1, max_age=300),
+                                  food=Food(300))
+                    message_log.add_message(Message("You butcher the flesh of the " +
+                                                    e.name[11:] + ".", libtcod.white))
+                    e.char = ','
+                    e.name = 'bits of ' + e.name[11:]
+                    # using 11: as a means to remove "remains of " is messy
+                    e.classification.remove("corpse")
+                    e.classification.append("corpse_bits")
+                    player.inventory.add_item(item)
+
+        elif rest:
+            if player.fighter.hp == player.fighter.max_hp:
+                message_log.add_message(Message('You feel too awake to take a rest!', libtcod.yellow))
+            elif player.hunger.saturation < player.hunger.starving_saturation:
+                message_log.add_message(Message('You are too hungry to sleep!', libtcod.yellow))
+            else:
+                self.set_game_state(GameStates.RESTING)
+
+        return results
+
+    def change_floor(self, downwards, took_stairs=True):
+        start = time.perf_counter()
+        self.entities = self.game_map.next_floor(self.player, self.entities, self.message_log,
+                                                 self.constants, downwards, took_stairs)
+        self.refresh_fov(True)
+        if downwards:
+            self.game.lowest_level = self.game_map.dungeon_level
+        self.profiler.add("floors", start)
+        return [{"new_floor": True}]
+
+    def enable_wizard_mode(self):
+        player = self.player
+
+        self.message_log.add_message(Message("Initiating wizard mode...", libtcod.red))
+        player.wizard_mode = True
+        player.fighter.STR = 100
+        player.fighter.DEX = 100
+        player.fighter.CON = 100
+        player.fighter.INT = 100
+        player.fighter.WIS = 100
+        player.fighter.CHA = 100
+        player.fighter.heal(100)
+
+        death_wand = get_item("death_wand", -1, -1)
+        identify_item_in_list(death_wand, self.identities)
+        death_wand.item.chargeable = Chargeable(9999, 9999)
+        player.inventory.add_item(death_wand)
+
+    def take_menu_action(self, action, player_turn_results):
+        # The actions that work in more than one game state. Returns the result
+        # that ends the game, if the action does.
+        player = self.player
+        entities = self.entities
+        game_map = self.game_map
+        message_log = self.message_log
+        identities = self.identities
+        key_cursor = self.key_cursor
+
+        move = action.get('move')
+        end = action.get('end')
+        inventory_index = action.get('inventory_index')
+        level_up = action.get('level_up')
+        scroll_messages = action.get('scroll_messages')
+        scroll_message_pages = action.get('scroll_message_pages')
+        left_click = action.get('left_click')
+        right_click = action.get('right_click')
+
+        debug_dump_info = None
+        debug_dump_to_file = None
+        debug_print_fov = None
+        debug_identify = None
+        if hasattr(player, "wizard_mode") and player.wizard_mode:
+            debug_dump_info = action.get("debug_dump_info")
+            debug_dump_to_file = action.get("debug_dump_to_file")
+            debug_print_fov = action.get("debug_print_fov")
+            debug_identify = action.get("debug_identify")
+
+        if action.get('show_inventory'):
+            self.set_game_state(GameStates.SHOW_INVENTORY)
+
+        if action.get('drop_inventory'):
+            self.set_game_state(GameStates.DROP_INVENTORY)
+
+        if inventory_index is not None and self.previous_game_state != GameStates.PLAYER_DEAD and inventory_index < len(player.inventory.items):
+            item = player.inventory.items[inventory_index]
+            if self.game_state == GameStates.SHOW_INVENTORY:
+                player_turn_results.extend(player.inventory.use(item, entities=entities, fov_map=self.fov_map, game_map=game_map, identities=identities))
+            elif self.game_state == GameStates.DROP_INVENTORY:
+                player_turn_results.extend(player.inventory.drop_item(item))
+            elif self.game_state == GameStates.IDENTIFY_INVENTORY:
+                player_turn_results.extend(player.inventory.identify_item(item, identities))
+            elif self.game_state == GameStates.CHARGE_INVENTORY:
+                player_turn_results.extend(player.inventory.charge_item(item))
+            elif self.game_state == GameStates.ENCHANT_INVENTORY:
+                player_turn_results.extend(player.inventory.enchant_item(item))
+
+        if level_up:
+            if level_up == 'STR':
+                player.fighter.STR += 1
+            if level_up == 'DEX':
+                player.fighter.DEX += 1
+            if level_up == 'CON':
+                player.fighter.CON += 1
+            if level_up == 'INT':
+                player.fighter.INT += 1
+            if level_up == 'WIS':
+                player.fighter.WIS += 1
+            if level_up == 'CHA':
+                player.fighter.CHA += 1
+
+            self.game_state = self.previous_game_state
+
+        if action.get('show_character_screen'):
+            self.set_game_state(GameStates.CHARACTER_SCREEN)
+
+        if action.get('show_help_screen'):
+            self.set_game_state(GameStates.HELP_SCREEN)
+
+        if action.get('show_message_log'):
+            self.set_game_state(GameStates.MESSAGE_LOG)
+            message_log.scroll = 0
+
+        if scroll_messages:
+            message_log.scroll_back(scroll_messages)
+
+        if scroll_message_pages:
+            message_log.scroll_back(scroll_message_pages * SCROLLBACK_HEIGHT)
+
+        if action.get("look_at"):
+            self.set_game_state(GameStates.LOOK_AT)
+            key_cursor.x, key_cursor.y = player.x, player.y
+            message_log.add_message(Message("Use the direction keys to move the cursor, \'.\' to examine an entity, or Esc to exit.", libtcod.white))
+
+        if action.get("look_at_entity"):
+            matching_entities = []
+            for e in get_entities_at_location(entities, key_cursor.x, key_cursor.y):
+                if e.x == key_cursor.x and e.y == key_cursor.y and (self.fov_map.fov[key_cursor.y][key_cursor.x] or ((e.stairs or e.door or e.sign or e.trap) and game_map.explored[key_cursor.x, key_cursor.y])):
+                    if e.trap and not e.trap.revealed:
+                        pass
+                    else:
+                        matching_entities.append(e.name)
+
+            message_log.add_message(Message(", ".join(matching_entities), libtcod.lightest_sepia))
+
+        if self.game_state == GameStates.TARGETING:
+            if left_click:
+                target_x, target_y = left_click
+
+                item_use_results = player.inventory.use(self.targeting_item,
+                                                        entities=entities,
+                                                        fov_map=self.fov_map,
+                                                        game_map=game_map,
+                                                        target_x=target_x,
+                                                        target_y=target_y,
+                                                        identities=identities)
+                player_turn_results.extend(item_use_results)
+                player_turn_results.extend(player.hunger.tick(HungerType.STATIC))
+            elif right_click:
+                player_turn_results.append({'targeting_cancelled': True})
+
+        if self.game_state == GameStates.LOOK_AT:
+            if move:
+                dx, dy = move
+                if key_cursor.x + dx >= 0 and key_cursor.x + dx < self.constants["map_width"]:
+                    key_cursor.x += dx
+                if key_cursor.y + dy >= 0 and key_cursor.y + dy < self.constants["map_height"]:
+                    key_cursor.y += dy
+
+                self.refresh_fov()
+
+        if action.get('quit_game_command'):
+            return [{'quit_game': True}]
+
+        if action.get('save_game_command'):
+            return [{'save_game': True}]
+
+        if end:
+            if self.game_state in (GameStates.SHOW_INVENTORY,
+                                   GameStates.DROP_INVENTORY,
+                                   GameStates.CHARACTER_SCREEN,
+                                   GameStates.HELP_SCREEN,
+                                   GameStates.MESSAGE_LOG,
+                                   GameStates.LOOK_AT):
+                self.game_state = self.previous_game_state
+                self.refresh_fov(True)
+
+            elif self.game_state == GameStates.TARGETING:
+                player_turn_results.append({'targeting_cancelled': True})
+
+            elif self.game_state == GameStates.PLAYER_DEAD:
+                return [{'quit_game': True}]
+
+            else:
+                return [{'save_game': True}]
+
+        if debug_dump_info:
+            print_log(debug_dump_to_file, player, entities, game_map, self.fov_map, self.profiler)
+
+        if debug_print_fov:
+            self.debug_show_fov = not self.debug_show_fov
+            self.refresh_fov(True)
+
+        if debug_identify:
+            for i in player.inventory.items:
+                player.inventory.identify_item(i, identities)
+            for e in get_entities_with_component(entities, "item"):
+                identify_item_in_list(e, identities)
+            message_log.add_message(Message("IDENTIFY!", libtcod.pink))
+
+        if self.game_state == GameStates.RESTING:
+            if player.fighter.hp == player.fighter.max_hp:
+                self.game_state = GameStates.PLAYERS_TURN
+
+        return None
+
+    def create_character(self, action):
+        player = self.player
+        game = self.game
+        identities = self.identities
+        creation_menu_cursor = self.creation_menu_cursor
+        results = []
+
+        menu_selection = action.get("menu_selection")
+        increase = action.get("increase")
+        decrease = action.get("decrease")
+        accept = action.get("accept")
+
+        if menu_selection:
+            if menu_selection == "up" and creation_menu_cursor.index[1] > 0:
+                creation_menu_cursor.index[1] -= 1
+            if menu_selection == "down" and creation_menu_cursor.index[1] < creation_menu_cursor.max_index[creation_menu_cursor.index[0]]:
+                creation_menu_cursor.index[1] += 1
+
+            if menu_selection == "left" and creation_menu_cursor.index[0] > 0:
+                creation_menu_cursor.index[0] -= 1
+                creation_menu_cursor.index[1] = 0
+            if menu_selection == "right" and creation_menu_cursor.index[0] < len(creation_menu_cursor.max_index) - 1:
+                creation_menu_cursor.index[0] += 1
+                creation_menu_cursor.index[1] = 0
+
+        if increase and creation_menu_cursor.index[0] == 0:
+            cost = 7 - (game.stat_diffs[creation_menu_cursor.index[1]] + 8)
+
+            if game.points_available + cost >= 0:
+                game.points_available += cost
+                game.stat_diffs[creation_menu_cursor.index[1]] += 1
+
+        if decrease and creation_menu_cursor.index[0] == 0:
+            cost = game.stat_diffs[creation_menu_cursor.index[1]]
+
+            if game.points_available + cost <= max_points_available and game.stat_diffs[creation_menu_cursor.index[1]] > 0:
+                game.points_available += cost
+                game.stat_diffs[creation_menu_cursor.index[1]] -= 1
+
+        # This needs to be separated to a new module
+        if accept:
+            if creation_menu_cursor.index[0] == len(creation_menu_cursor.max_index) - 1:
+                player.fighter.STR = 8 + game.stat_diffs[0]
+                player.fighter.DEX = 8 + game.stat_diffs[1]
+                player.fighter.CON = 8 + game.stat_diffs[2]
+                player.fighter.INT = 8 + game.stat_diffs[3]
+                player.fighter.WIS = 8 + game.stat_diffs[4]
+                player.fighter.CHA = 8 + game.stat_diffs[5]
+
+                if creation_menu_cursor.index[1] == 0:
+                    player.fighter.CON += 2
+                    player.fighter.INT += 1
+                elif creation_menu_cursor.index[1] == 1:
+                    player.fighter.DEX += 2
+                    player.fighter.WIS += 1
+                elif creation_menu_cursor.index[1] == 2:
+                    player.fighter.STR += 2
+                    player.fighter.DEX += 1
+                elif creation_menu_cursor.index[1] == 3:
+                    player.fighter.CHA += 2
+                    player.fighter.CON += 1
+                elif creation_menu_cursor.index[1] == 4:
+                    player.fighter.WIS += 2
+                    player.fighter.CHA += 1
+                elif creation_menu_cursor.index[1] == 5:
+                    player.fighter.INT += 2
+                    player.fighter.STR += 1
+
+                player.fighter.heal(50)
+                # this needs to dynamic per character's strength
+                player.inventory.capacity += (get_modifier(player.fighter.strength) * 10)
+
+                dagger = get_item("dagger", -1, -1)
+                armor = get_item("leather_armor", -1, -1)
+                potion = get_item("healing_potion", -1, -1)
+                identify_item_in_list(potion, identities)
+
+                player.inventory.items = []
+                # make item selectable instead of using just an index
+                # self: tower shield
+                if creation_menu_cursor.index[1] == 0:
+                    shield = get_item("tower_shield", -1, -1)
+                    player.inventory.add_item(shield)
+                    player.equipment.toggle_equip(shield)
+                # love: pacify wand and escape scrolls
+                elif creation_menu_cursor.index[1] == 1:
+                    pacify_wand = get_item("pacify_wand", -1, -1)
+                    escape_scrolls = get_item("escape_scroll", -1, -1, 3)
+                    identify_item_in_list(pacify_wand, identities)
+                    identify_item_in_list(escape_scrolls, identities)
+                    pacify_wand.item.chargeable.recharge(20)
+                    player.inventory.add_item(pacify_wand)
+                    player.inventory.add_item(escape_scrolls)
+                # peace: +2 dagger and wand of striking
+                elif creation_menu_cursor.index[1] == 2:
+                    dagger.equippable.enchantment = 2
+                    striking_wand = get_item("striking_wand", -1, -1)
+                    identify_item_in_list(striking_wand, identities)
+                    striking_wand.item.chargeable.recharge(20)
+                    player.inventory.add_item(striking_wand)
+                # prospertiy: greed wand and detect items scrolls
+                elif creation_menu_cursor.index[1] == 3:
+                    greed_wand = get_item("greed_wand", -1, -1)
+                    detect_items_scrolls = get_item("detect_items_scroll", -1, -1, 3)
+                    identify_item_in_list(greed_wand, identities)
+                    identify_item_in_list(detect_items_scrolls, identities)
+                    greed_wand.item.chargeable.recharge(20)
+                    player.inventory.add_item(greed_wand)
+                    player.inventory.add_item(detect_items_scrolls)
+                # the arts: lightning wand and enchantment scrolls
+                elif creation_menu_cursor.index[1] == 4:
+                    lightning_wand = get_item("lightning_wand", -1, -1)
+                    enchantment_scrolls = get_item("enchantment_scroll", -1, -1, 3)
+                    identify_item_in_list(enchantment_scrolls, identities)
+                    identify_item_in_list(lightning_wand, identities)
+                    lightning_wand.item.chargeable.recharge(20)
+                    player.inventory.add_item(lightning_wand)
+                    player.inventory.add_item(enchantment_scrolls)
+                # the stars: dowsing, mapping, and aura wands
+                elif creation_menu_cursor.index[1] == 5:
+                    dowsing_ring = get_item("dowsing_ring", -1, -1)
+                    mapping_scrolls = get_item("mapping_scroll", -1, -1, 3)
+                    detect_aura_scrolls = get_item("detect_aura_scroll", -1, -1, 3)
+                    identify_item_in_list(dowsing_ring, identities)
+                    identify_item_in_list(mapping_scrolls, identities)
+                    identify_item_in_list(detect_aura_scrolls, identities)
+                    player.inventory.add_item(mapping_scrolls)
+                    player.inventory.add_item(detect_aura_scrolls)
+                    player.inventory.add_item(dowsing_ring)
+                    player.equipment.toggle_equip(dowsing_ring)
+
+                # items across all inspirations
+                player.inventory.add_item(dagger)
+                player.equipment.toggle_equip(dagger)
+                player.inventory.add_item(armor)
+                player.equipment.toggle_equip(armor)
+                player.inventory.add_item(potion)
+
+                self.game_state = GameStates.PLAYERS_TURN
+                results.append({"redraw_map": True})
+            elif creation_menu_cursor.index[0] < len(creation_menu_cursor.max_index) - 1:
+                creation_menu_cursor.index[0] += 1
+                creation_menu_cursor.index[1] = 0
+
+        return results
+
+    def process_player_results(self, player_turn_results):
+        # handling a result can add more, like the damage from falling down a hole
+        player = self.player
+        game_map = self.game_map
+        message_log = self.message_log
+        identities = self.identities
+
+        i = 0
+        while i < len(player_turn_results):
+            player_turn_result = player_turn_results[i]
+
+            message = player_turn_result.get('message')
+            dead_entity = player_turn_result.get('dead')
+            item_added = player_turn_result.get('item_added')
+            gold_added = player_turn_result.get('gold_added')
+            item_consumed = player_turn_result.get('consumed')
+            food_eaten = player_turn_result.get("food_eaten")
+            item_dropped = player_turn_result.get('item_dropped')
+            item_identified = player_turn_result.get('item_identified')
+            item_charged = player_turn_result.get('item_charged')
+            item_enchanted = player_turn_result.get('item_enchanted')
+            equip = player_turn_result.get('equip')
+            targeting = player_turn_result.get('targeting')
+            targeting_cancelled = player_turn_result.get('targeting_cancelled')
+            xp = player_turn_result.get('xp')
+            enemy_gold_dropped = player_turn_result.get('enemy_gold_dropped')
+            drop_inventory = player_turn_result.get("drop_inventory")
+            teleport = player_turn_result.get("teleport")
+            identify_menu = player_turn_result.get("identify_menu")
+            charge_menu = player_turn_result.get("charge_menu")
+            enchant_menu = player_turn_result.get("enchant_menu")
+            downwards_exit = player_turn_result.get("downwards_exit")
+            light_added = player_turn_result.get("light_added")
+            light_removed = player_turn_result.get("light_removed")
+            forget_map = player_turn_result.get("forget_map")
+
+            if message:
+                message_log.add_message(message)
+
+            if dead_entity:
+                if dead_entity == player:
+                    message, self.game_state = kill_player(dead_entity, self.game, identities)
+                else:
+                    message = kill_monster(dead_entity, self.fov_map)
+
+                message_log.add_message(message)
+
+            if item_added:
+                self.entities.remove(item_added)
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.ENEMY_TURN
+
+            if gold_added:
+                self.entities.remove(gold_added)
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.ENEMY_TURN
+
+            if (item_consumed or food_eaten) and self.game_state is not GameStates.PLAYER_DEAD:
+                if item_consumed is not None and isinstance(item_consumed, Entity):
+                    identify_item_in_list(item_consumed, identities)
+                    identities[item_consumed.id] = True
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.ENEMY_TURN
+
+            if item_dropped:
+                self.entities.append(item_dropped)
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.ENEMY_TURN
+
+            if item_identified or item_charged or item_enchanted:
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.ENEMY_TURN
+
+            if equip:
+                equip_results = player.equipment.toggle_equip(equip)
+                for equip_result in equip_results:
+                    equipped = equip_result.get('equipped')
+                    unequipped = equip_result.get('unequipped')
+                    if equipped:
+                        message_log.add_message(Message(
+                            'You equipped the {0}.'.format(equipped.get_name)))
+                    if unequipped:
+                        message_log.add_message(Message(
+                            'You unequipped the {0}.'.format(unequipped.get_name)))
+
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.ENEMY_TURN
+
+            if targeting:
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.TARGETING
+
+                self.targeting_item = targeting
+                message_log.add_message(self.targeting_item.item.targeting_message)
+
+            if targeting_cancelled:
+                self.game_state = self.previous_game_state
+                message_log.add_message(Message('Targeting cancelled.'))
+
+            if xp:
+                leveled_up = player.level.add_xp(xp)
+                message_log.add_message(Message('You gain {0} experience points.'.format(xp)))
+
+                if leveled_up:
+                    message_log.add_message(Message(
+                        'Your battle skills grow stronger! You reached level {0}!'.format(
+                            player.level.current_level), libtcod.yellow))
+                    self.previous_game_state = GameStates.PLAYERS_TURN
+                    self.game_state = GameStates.LEVEL_UP
+
+            if enemy_gold_dropped:
+                self.entities.append(enemy_gold_dropped)
+
+            if drop_inventory:
+                for item in drop_inventory.items:
+                    self.entities.append(drop_inventory.drop_item(item)[0].get("item_dropped"))
+
+            if teleport:
+                self.refresh_fov(True)
+
+            if identify_menu:
+                self.set_game_state(GameStates.IDENTIFY_INVENTORY)
+
+            if charge_menu:
+                self.set_game_state(GameStates.CHARGE_INVENTORY)
+
+            if enchant_menu:
+                self.set_game_state(GameStates.ENCHANT_INVENTORY)
+
+            if downwards_exit:
+                player_turn_results.extend(self.change_floor(True, False))
+
+                message_log.add_message(Message('You fall to the floor below!',
+                                                libtcod.yellow))
+                player_turn_results.extend(player.fighter.take_damage(player.fighter.max_hp // 5))
+
+            if light_added:
+                self.player_light_sources.append(light_added)
+                self.refresh_fov(True)
+
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.ENEMY_TURN
+
+            if light_removed and light_removed in self.player_light_sources:
+                self.player_light_sources.remove(light_removed)
+                self.refresh_fov(True)
+
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.ENEMY_TURN
+
+            if forget_map:
+                game_map.explored[:] = False
+                self.refresh_fov(True)
+                player_turn_results.append({"redraw_map": True})
+
+            i += 1
+
+        return player_turn_results
+
+    def take_enemy_turn(self):
+        player = self.player
+        entities = self.entities
+        game_map = self.game_map
+        fov_map = self.fov_map
+        message_log = self.message_log
+        constants = self.constants
+        results = []
+
+        start = time.perf_counter()
+        navigation = game_map.refresh_navigation(entities)
+        # only the monsters that are due this turn are popped, idle ones sleep in the queue
+        scheduler = entities.scheduler
+        for entity in scheduler.get_dormant():
+            if entity.distance_to(player) <= constants['wake_distance'] or fov_map.fov[entity.y][entity.x]:
+                scheduler.wake(entity)
+
+        entity = scheduler.pop_due()
+        while entity:
+            if entity.ai:
+                ai_start = time.perf_counter()
+                enemy_turn_results = entity.ai.take_turn(player, fov_map, game_map, entities)
+                self.profiler.add("ai", ai_start)
+                navigation.update(entity)
+                scheduler.acted(entity)
+                if (entity.ai and can_go_dormant(entity.ai) and not fov_map.fov[entity.y][entity.x] and
+                    entity.distance_to(player) > constants['dormant_distance']):
+                    scheduler.make_dormant(entity, constants['dormant_turns'])
+
+                for enemy_turn_result in enemy_turn_results:
+                    results.append(enemy_turn_result)
+                    message = enemy_turn_result.get('message')
+                    dead_entity = enemy_turn_result.get('dead')
+                    spawn_enemy = enemy_turn_result.get('spawn_enemy')
+                    downwards_exit = enemy_turn_result.get("downwards_exit")
+
+                    if message:
+                        message_log.add_message(message)
+                    if dead_entity:
+                        if dead_entity == player:
+                            message, self.game_state = kill_player(dead_entity, self.game, self.identities)
+                        else:
+                            message = kill_monster(dead_entity, fov_map)
+                        message_log.add_message(message)
+                        navigation.update(dead_entity)
+
+                        if self.game_state == GameStates.PLAYER_DEAD:
+                            break
+                    if spawn_enemy:
+                        new_enemy = get_monster(spawn_enemy.get("name"),
+                                                spawn_enemy.get("x"),
+                                                spawn_enemy.get("y"))
+                        if spawn_enemy.get("mother"):
+                            new_enemy.ai.mother = spawn_enemy.get("mother")
+                        entities.append(new_enemy)
+                        navigation.update(new_enemy)
+                    if downwards_exit:
+                        if fov_map.fov[entity.y][entity.x]:
+                            message_log.add_message(Message('{0} fell down a hole!'.format(
+                                entity.name.capitalize()),
+                                                            libtcod.white))
+                        navigation.remove(entity)
+                        entities.remove(entity)
+                        break
+
+                if self.game_state == GameStates.PLAYER_DEAD:
+                    break
+
+            entity = scheduler.pop_due()
+        else:
+            self.profiler.add("enemies", start)
+            start = time.perf_counter()
+            scheduler.end_turn()
+            old_game_state = self.game_state
+            self.turn, self.game_state = tick_turn(self.turn, player, entities, self.game_state,
+                                                   message_log, self.game, fov_map,
+                                                   self.player_light_sources, self.identities)
+            # every turn draws from streams seeded for it, so a loaded game carries on the same way
+            seed_streams(game_map.seed, self.turn)
+            if self.game_state == old_game_state:
+                self.game_state = self.previous_game_state
+            results.append({"turn_ended": True})
+            self.profiler.add("tick", start)
+            start = None
+
+        if start is not None:
+            # the player died before every monster had its turn
+            self.profiler.add("enemies", start)
+        game_map.navigation = None
+        return results
+
+def tick_turn(turn, player, entities, game_state, message_log, game, fov_map, player_light_sources, identities):
+    expired = []
+    expired_items = []
+
+    if player.hunger.saturation > player.hunger.hungry_saturation:
+        if turn % 10 == 0:
+            player.fighter.heal(1)
+    elif player.hunger.saturation > player.hunger.starving_saturation:
+        if turn % 20 == 0:
+            player.fighter.heal(1)
+    
+    for e in get_entities_with_component(entities, "item"):
+        if e.item.age is not None:
+            e.item.age += 1
+            if e.item.age >= e.item.max_age:
+                expired.append(e)
+        elif e.item.light_source is not None and e.item.light_source.lit:
+            e.item.light_source.tick(message_log, False)
+
+    for e in get_entities_with_component(entities, "inventory"):
+        for i in e.inventory.items:
+            if i.item and i.item.age is not None:
+                i.item.age += 1
+                if i.item.age >= i.item.max_age:
+                    expired_items.append(i)
+            elif i.item.light_source is not None and i.item.light_source.lit:
+                i.item.light_source.tick(message_log, True)
+                if i.item.light_source.get_light < 0 and i.item.light_source in player_light_sources:
+                    player_light_sources.remove(e.item.light_source)
+        for i in expired_items:
+            e.inventory.remove_item(i, i.item.count)
+
+    for e in get_entities_with_component(entities, "fighter"):
+        # killed earlier this tick
+        if not e.fighter:
+            continue
+
+        results = []
+        
+        results.extend(e.fighter.effects.tick())
+        
+        for result in results:
+            message = result.get("message")
+            poison_damage = result.get("poison_damage")
+            regeneration = result.get("regeneration")
+            invisible = result.get("invisible")
+            stuck = result.get("stuck")
+            
+            if message:
+                message_log.add_message(message)
+
+            if poison_damage and turn % 10 == 0:
+                death_results = []
+                death_results.extend(e.fighter.take_damage(4))
+                for death_result in death_results:
+                    dead_entity = death_result.get('dead')
+                    if dead_entity:
+                        if dead_entity == player:
+                            message, game_state = kill_player(e, game, identities)
+                        else:
+                            message = kill_monster(e, fov_map)
+                        message_log.add_message(message)
+
+            if regeneration and turn % 10 == 0:
+                e.fighter.heal(2)
+
+            if invisible is not None and invisible <= 0:
+                if e.ai:
+                    message_log.add_message(Message("The {0} reappears!".format(e.name),
+                                                    libtcod.white))
+                else:
+                    message_log.add_message(Message("Color starts to reappear on your body!",
+                                                libtcod.yellow))
+
+            if stuck is not None and stuck <= 0:
+                if e.ai and fov_map.fov[e.y][e.x]:
+                    message_log.add_message(Message("The {0} is freed!".format(e.name),
+                                                    libtcod.white))
+                elif not e.ai:
+                    message_log.add_message(Message("You become freed!",
+                                                    libtcod.green))
+
+    for e in expired:
+        entities.remove(e)
+                
+    return turn + 1, game_state
+
+def get_light(player_light_sources):
+    if len(player_light_sources) > 0:
+        return max(light.get_light for light in player_light_sources)
+    return 0
+
+def search_surrounding_tiles(player, entities, instant_search):
+    for x in range(player.x - 1, player.x + 2):
+        for y in range(player.y - 1, player.y + 2):
+            ents = get_entities_at_location(entities, x, y)
+            if len(ents) > 0:
+                for e in ents:
+                    if e.trap and not e.trap.revealed:
+                        # 10% chance to reveal traps
+                        if instant_search or misc_random.random() < 0.1:
+                            e.trap.set_reveal(True)
+
+def print_log(debug_dump_to_file, player, entities, game_map, fov_map, profiler):
+    current_time = datetime.datetime.now()
+    f = open("{0}.txt".format(current_time.strftime("logfile_%Y_%m_%d_%H_%M_%S")), "w+")
+
+    if debug_dump_to_file:
+        f.write("Entities:\n")
+    else:
+        print("Entities:")
+    
+    for e in entities:
+        line = ""
+        line += "{0} ({1}): ({2}, {3})".format(e.name, e.id, e.x, e.y)
+        if e.item:
+            line += ". This is an item."
+        elif e.ai and e.fighter:
+            line += ".\nThis is monster has {0}/{1} HP.".format(e.fighter.max_hp, e.fighter.hp)
+            if fov_map.fov[e.y][e.x]:
+                line += " It is in the FOV."
+            else:
+                line += " It is not in the FOV."
+        elif e.trap:
+            line += ". This is a trap."
+        elif e.sign:
+            line += ".\nThis is sign reads \"{0}\".".format(e.sign.text)
+        elif e.stairs:
+            line += ". These are stairs."
+        elif e.door:
+            line += ". This is a door."
+        if debug_dump_to_file:
+            f.write(line + "\n\n")
+        else:
+            print(line + "\n")
+    
+    if debug_dump_to_file:
+        f.write("\nGame map:\n")
+    else:
+        print("\nGame map:")
+
+    for r in range(game_map.height):
+        line = ""
+        for c in range(game_map.width):
+            entities_in_loc = get_entities_at_location(entities, c, r)
+            
+            if player.x == c and player.y == r:
+                line += "@"
+            elif len(entities_in_loc) > 0:
+                top_entity = sorted(entities_in_loc, key=lambda e: e.render_order.value)[0]
+                if top_entity.item:
+                    line += "*"
+                elif top_entity.ai:
+                    line += "A"
+                elif top_entity.trap:
+                    line += "^"
+                elif top_entity.sign:
+                    line += "|"
+                elif top_entity.stairs:
+                    line += ">"
+                elif top_entity.door:
+                    line += "+"
+            elif game_map.blocked[c, r]:
+                line += "#"
+            else:
+                line += "."
+                
+        if debug_dump_to_file:
+            f.write(line + "\n")
+        else:
+            print(line)
+    
+    if debug_dump_to_file:
+        f.write("\nFOV map:\n")
+    else:
+        print("\nFOV map:")
+                
+    for r in range(game_map.height):
+        line = ""
+        for c in range(game_map.width):
+            entities_in_loc = get_entities_at_location(entities, c, r)
+            
+            if player.x == c and player.y == r:
+                line += "@"
+            elif len(entities_in_loc) > 0:
+                if fov_map.fov[r][c]:
+                    line += "!"
+                else:
+                    line += "?"
+            elif fov_map.fov[r][c]:
+                line += "1"
+            else:
+                line += "0"
+                
+        if debug_dump_to_file:
+            f.write(line + "\n")
+        else:
+            print(line)
+
+    if debug_dump_to_file:
+        f.write("\nTurn timings:\n")
+    else:
+        print("\nTurn timings:")
+
+    for line in profiler.get_report():
+        if debug_dump_to_file:
+            f.write(line + "\n")
+        else:
+            print(line)
+                    
+    if debug_dump_to_file:
+        f.close()
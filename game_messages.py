@@ -1,24 +1,57 @@
 import tcod as libtcod
 import textwrap
+from collections import deque
+
+# how many messages are kept for the scrollback
+MESSAGE_HISTORY = 1000
+
+# the lines of text the scrollback viewer shows, see menus.message_log_screen
+SCROLLBACK_WIDTH = 68
+SCROLLBACK_HEIGHT = 36
 
 class Message:
     def __init__(self, text, color=libtcod.white):
         self.text = text
         self.color = color
+        # the wrapped lines for each width they were drawn at
+        self.lines = {}
+
+    def wrap(self, width):
+        if width not in self.lines:
+            self.lines[width] = textwrap.wrap(self.text, width)
+        return self.lines[width]
 
 class MessageLog:
-    def __init__(self, x, width, height):
-        self.messages = []
+    # Keeps the last MESSAGE_HISTORY messages as they were added. They are only
+    # wrapped when drawn, so adding a message is cheap however long it is.
+    def __init__(self, x, width, height, history=MESSAGE_HISTORY):
+        self.messages = deque(maxlen=history)
         self.x = x
         self.width = width
         self.height = height
+        # how many lines the scrollback viewer is scrolled up from the newest one
+        self.scroll = 0
 
     def add_message(self, message):
         if message is not None:
-            new_msg_lines = textwrap.wrap(message.text, self.width)
+            self.messages.append(message)
+
+    def get_lines(self, width, height, scroll=0):
+        # The (text, color) of the height lines that end scroll lines above the
+        # newest one. Only the newest messages, which fill those lines, get wrapped.
+        lines = []
+        for message in reversed(self.messages):
+            if len(lines) >= height + scroll:
+                break
+            for line in reversed(message.wrap(width)):
+                lines.append((line, message.color))
+
+        return lines[scroll:scroll + height][::-1]
 
-            for line in new_msg_lines:
-                if len(self.messages) == self.height:
-                    del self.messages[0]
+    def count_lines(self, width):
+        return sum(len(message.wrap(width)) for message in self.messages)
 
-                self.messages.append(Message(line, message.color))
+    def scroll_back(self, lines):
+        # negative lines scroll towards the newest messages
+        max_scroll = max(0, self.count_lines(SCROLLBACK_WIDTH) - SCROLLBACK_HEIGHT)
+        self.scroll = max(0, min(max_scroll, self.scroll + lines))
@@ -18,3 +18,4 @@ class GameStates(Enum):
     CHARGE_INVENTORY = 15
     ENCHANT_INVENTORY = 16
     PLAYER_WIN = 17
+    MESSAGE_LOG = 18
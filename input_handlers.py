@@ -18,12 +18,20 @@ def handle_keys(key, game_state):
         return handle_character_screen(key)
     elif game_state == GameStates.HELP_SCREEN:
         return handle_help_screen(key)
+    elif game_state == GameStates.MESSAGE_LOG:
+        return handle_message_log_keys(key)
     elif game_state == GameStates.LOOK_AT:
         return handle_key_targeting(key)
     elif game_state == GameStates.CHARACTER_CREATION:
         return handle_creation_screen(key)
     return {}
 
+def wait_for_event(key, mouse, timeout):
+    # Sleeps until there is input or timeout seconds go by, then reads it like
+    # sys_check_for_event. Waiting without an event to fill leaves it on the queue.
+    libtcod.lib.SDL_WaitEventTimeout(libtcod.ffi.NULL, int(timeout * 1000))
+    libtcod.sys_check_for_event(libtcod.EVENT_KEY_PRESS | libtcod.EVENT_MOUSE, key, mouse)
+
 def handle_player_turn_keys(key):
     key_char = chr(key.c)
     
@@ -76,6 +84,8 @@ def handle_player_turn_keys(key):
         return {'quit_game_command': True}
     elif key_char == 's' and key.lctrl:
         return {'save_game_command': True}
+    elif key_char == 'p' and key.lctrl:
+        return {'show_message_log': True}
     
     elif key.vk == libtcod.KEY_ESCAPE:
         return {'end': True}
@@ -91,6 +101,8 @@ def handle_player_turn_keys(key):
         return {"debug_print_fov": True}
     elif key.vk == libtcod.KEY_F3:
         return {"debug_identify": True}
+    elif key.vk == libtcod.KEY_F4:
+        return {"toggle_profiler": True}
 
     return {}
 
@@ -103,6 +115,8 @@ def handle_player_dead_keys(key):
         return {'show_character_screen': True}
     elif key_char == 'q':
         return {'show_help_screen': True}
+    elif key_char == 'p' and key.lctrl:
+        return {'show_message_log': True}
     elif key.vk == libtcod.KEY_ESCAPE or (key_char == 'q' and key.lctrl):
         return {'end': True}
     elif key_char == 'f' and key.lctrl:
@@ -197,6 +211,23 @@ def handle_help_screen(key):
             return {'end': True}
     return {}
 
+def handle_message_log_keys(key):
+    key_char = chr(key.c)
+
+    if key.vk == libtcod.KEY_ESCAPE or (key_char == 'p' and key.lctrl):
+        return {'end': True}
+    elif key_char == 'f' and key.lctrl:
+        return {'fullscreen': True}
+    elif key.vk == libtcod.KEY_UP or key.vk == libtcod.KEY_KP8 or key_char == 'k':
+        return {'scroll_messages': 1}
+    elif key.vk == libtcod.KEY_DOWN or key.vk == libtcod.KEY_KP2 or key_char == 'j':
+        return {'scroll_messages': -1}
+    elif key.vk == libtcod.KEY_PAGEUP:
+        return {'scroll_message_pages': 1}
+    elif key.vk == libtcod.KEY_PAGEDOWN:
+        return {'scroll_message_pages': -1}
+    return {}
+
 def handle_key_targeting(key):
     if key.vk == libtcod.KEY_ESCAPE:
         return {'end': True}
@@ -1,9 +1,10 @@
 import tcod as libtcod
 from components.ai import ConfusedMonster, StaticMonster, HardStoppedMonster, SoftStoppedMonster, NeutralMonster
 from effect import Effect, tick_invisible, tick_poison, tick_regeneration, tick_detect_aura, tick_detect_items, tick_stuck
+from entity import get_entities_at_location, get_entities_with_component
 from fov_functions import initialize_fov
 from game_messages import Message
-from random import randint
+from random_utils import misc_random
 from rpg_mechanics import attack_success, die, get_modifier
 
 def heal(*args, **kwargs):
@@ -298,8 +299,8 @@ def cast_detect_traps(*args, **kwargs):
 
     traps_found = False
     
-    for e in entities:
-        if e.trap and not e.trap.revealed:
+    for e in get_entities_with_component(entities, "trap"):
+        if not e.trap.revealed:
             e.trap.set_reveal(True)
             traps_found = True
     if traps_found:
@@ -320,9 +321,9 @@ def cast_detect_stairs(*args, **kwargs):
 
     stairs_found = False
     
-    for e in entities:
-        if e.stairs and not game_map.tiles[e.x][e.y].explored:
-            game_map.tiles[e.x][e.y].explored = True
+    for e in get_entities_with_component(entities, "stairs"):
+        if not game_map.explored[e.x, e.y]:
+            game_map.explored[e.x, e.y] = True
             stairs_found = True
     if stairs_found:
         results.append({"consumed": True, "message": Message("You become aware of the stairs on this floor!", libtcod.white)})
@@ -342,10 +343,10 @@ def cast_random_teleportation(*args, **kwargs):
     results = []
 
     while True:
-        x = randint(0, game_map.width - 1)
-        y = randint(0, game_map.height - 1)
+        x = misc_random.randint(0, game_map.width - 1)
+        y = misc_random.randint(0, game_map.height - 1)
 
-        if not game_map.is_blocked(x, y) and not any([entity for entity in entities if entity.x == x and entity.y == y]):
+        if not game_map.is_blocked(x, y) and not get_entities_at_location(entities, x, y):
             caster.x = x
             caster.y = y
             results.append({"consumed": item, 'message': Message('You teleported!', libtcod.purple), "teleport": True})
@@ -368,7 +369,7 @@ def cast_blink(*args, **kwargs):
 
     if not fov_map.fov[target_y][target_x]:
         results.append({'consumed': False, 'message': Message('You cannot target a tile outside your field of view.', libtcod.yellow)})
-    elif game_map.is_blocked(target_x, target_y) or any([entity for entity in entities if entity.x == target_x and entity.y == target_y]):
+    elif game_map.is_blocked(target_x, target_y) or get_entities_at_location(entities, target_x, target_y):
         results.append({'consumed': False, 'message': Message("You can't seem to blink there.", libtcod.yellow)})
     else:
         caster.x = target_x
@@ -469,20 +470,10 @@ def cast_mapping(*args, **kwargs):
 
     results = []
 
-    all_tiles_explored = True
-    
-    for x in range(0, game_map.width):
-        for y in range(0, game_map.height):
-            if not game_map.tiles[x][y].explored:
-                all_tiles_explored = False
-                break
-
-    if all_tiles_explored:
+    if game_map.explored.all():
         results.append({"message": Message("You've already explored the whole map!", libtcod.yellow)})
     else:
-        for x in range(0, game_map.width):
-            for y in range(0, game_map.height):
-                game_map.tiles[x][y].explored = True
+        game_map.explored[:] = True
 
     results.append({"consumed": True, "teleport": True})
 
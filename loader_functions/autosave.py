@@ -0,0 +1,65 @@
+import threading
+
+from loader_functions.data_loaders import snapshot_game, write_game_snapshot
+
+class Autosaver:
+    # Saves the game without holding up the main loop. The game is pickled into a
+    # snapshot on the main thread, which is quick and can't see it half way through a
+    # turn, and a worker thread compresses and writes it. Only the newest snapshot
+    # that hasn't been written yet is kept.
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pending = None
+        self.writing = False
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def save(self, player, entities, game_map, message_log, game_state, turn, identities):
+        if game_map.test_map:
+            return
+
+        snapshot = snapshot_game(player, entities, game_map, message_log, game_state, turn, identities)
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                snapshot, self.pending = self.pending, None
+                self.writing = True
+
+            try:
+                write_game_snapshot(snapshot)
+            except OSError as e:
+                print("Autosave failed: {0}".format(e))
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+    def wait(self):
+        # until every snapshot taken so far is on disk
+        with self.condition:
+            while self.pending is not None or self.writing:
+                self.condition.wait()
+
+    def cancel(self):
+        # Drops the snapshot that hasn't been written and waits for the one being
+        # written, so that saving or deleting the game afterwards isn't undone by it.
+        with self.condition:
+            self.pending = None
+            while self.writing:
+                self.condition.wait()
+
+    def close(self):
+        self.cancel()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
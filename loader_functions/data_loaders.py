@@ -1,24 +1,50 @@
 import csv
 import os
 import shelve
+import shutil
+import threading
 
+from entity import EntityList
 from game_container import GameContainer
+from loader_functions.entity_definitions import associate_identities, reassign_identities
+from loader_functions.save_format import dump_save, load_save, read_save, write_save
+from random_utils import seed_streams
 
 savegame_filename = "savegame.dat"
+# the floors of the saved game that the player has left, see FloorStore
+floors_directory = "floors"
 test_map_filename = "assets/test_map.csv"
 tutorial_map_filename = "assets/tutorial_map.csv"
 high_scores_filename = "high_scores.dat"
 
+# held while the save file is written or deleted, which autosaves do on another thread
+save_lock = threading.Lock()
+
+def snapshot_game(player, entities, game_map, message_log, game_state, turn, identities):
+    return dump_save({
+        'player_index': entities.index(player),
+        # the list is rebuilt on load, once its entities are filled in
+        'entities': list(entities),
+        'scheduler': entities.scheduler,
+        'game_map': game_map,
+        'message_log': message_log,
+        'game_state': game_state,
+        'turn': turn,
+        'identities': identities
+    })
+
+def write_game_snapshot(snapshot):
+    # written next to the old save first, so a failed save doesn't lose it
+    with save_lock:
+        temporary_filename = savegame_filename + ".tmp"
+        with open(temporary_filename, 'wb') as data_file:
+            write_save(data_file, snapshot)
+        os.replace(temporary_filename, savegame_filename)
+
 def save_game(player, entities, game_map, message_log, game_state, turn, identities):
     if not game_map.test_map:
-        with shelve.open(savegame_filename, 'n') as data_file:
-            data_file['player_index'] = entities.index(player)
-            data_file['entities'] = entities
-            data_file['game_map'] = game_map
-            data_file['message_log'] = message_log
-            data_file['game_state'] = game_state
-            data_file['turn'] = turn
-            data_file['identities'] = identities
+        write_game_snapshot(snapshot_game(player, entities, game_map, message_log,
+                                          game_state, turn, identities))
 
 def game_exists():
     return os.path.isfile(savegame_filename)
@@ -27,21 +53,30 @@ def load_game():
     if not os.path.isfile(savegame_filename):
         raise FileNotFoundError
 
-    with shelve.open(savegame_filename, 'r') as data_file:
-        player_index = data_file['player_index']
-        entities = data_file['entities']
-        game_map = data_file['game_map']
-        message_log = data_file['message_log']
-        game_state = data_file['game_state']
-        turn = data_file['turn']
-        identities = data_file['identities']
+    with open(savegame_filename, 'rb') as data_file:
+        return restore_game(read_save(data_file))
+
+def load_game_snapshot(snapshot):
+    # the game a snapshot_game snapshot was taken of
+    return restore_game(load_save(snapshot))
+
+def restore_game(data):
+    entities = EntityList(data['entities'])
+    entities.scheduler = data['scheduler']
+    player = entities[data['player_index']]
 
-    player = entities[player_index]
-    return player, entities, game_map, message_log, game_state, turn, identities
+    # the identities are drawn again from the run seed, the same way they were first drawn
+    seed_streams(data['game_map'].seed)
+    associate_identities(data['identities'])
+    reassign_identities(entities, keep_identified=True)
+    return (player, entities, data['game_map'], data['message_log'], data['game_state'],
+            data['turn'], data['identities'])
 
 def delete_game():
-    if os.path.isfile(savegame_filename):
-        os.remove(savegame_filename)
+    with save_lock:
+        if os.path.isfile(savegame_filename):
+            os.remove(savegame_filename)
+        shutil.rmtree(floors_directory, ignore_errors=True)
 
 def load_test_map_tiles():
     datafile = open(test_map_filename, 'r')
@@ -18,7 +18,7 @@ from effect import Effect, effects_list
 from entity import Entity
 from game_messages import Message
 from item_functions import heal, invisible, cast_lightning, cast_fireball, cast_confuse, cast_stun, cast_sleep, cast_greed, cast_detect_traps, cast_random_teleportation, cast_blink, cast_detect_stairs, cast_pacify, cast_force_bolt, poison, cure_poison, regeneration, cast_mapping, cast_identify_item, cast_charge_item, cast_detect_aura, cast_detect_items, cast_make_invisible, cast_death, cast_downwards_exit, amnesia, cast_enchant_item
-from random import random, randint, choice
+from random_utils import identity_random, loot_random
 from render_functions import RenderOrder
 
 monster_definitions = "assets/monster_definitions.json"
@@ -165,7 +165,7 @@ def load_monsters():
                         can_be_pacified = ai_details.get("can_be_pacified")
                     if ai_details.get("health_threshold"):
                         health_threshold = ai_details.get("health_threshold")
-                    if ai_details.get("saf_range"):
+                    if ai_details.get("safe_range"):
                         safe_range = ai_details.get("safe_range")
 
                 inventory_component = None
@@ -174,7 +174,7 @@ def load_monsters():
                     inventory_component = Inventory(500)
                     for key, value in inventory.items():
                         # accomodate for weights greater than 1
-                        if random() < value:
+                        if loot_random.random() < value:
                             inventory_component.add_item(get_item(key, -1, -1))
 
                 ai_component = get_ai(ai_type, patience, min_spread_time, max_spread_time,
@@ -369,17 +369,28 @@ def load_identities():
                 
     return identity_defs
 
-def associate_identities():
+def associate_identities(identified=None):
+    # Gives every kind of potion, scroll, ring and wand its own identity, drawn from
+    # the identity stream. identified holds the ids of the kinds already identified.
+    if identified is None:
+        identified = {}
     for t in ["potion", "scroll", "ring", "wand"]:
         item_ids[t] = [i.id for i in item_defs.values() if (t in i.classification)]
+        identity_associations[t] = []
+        for identity in identities[t]:
+            identity.identified = False
         for i in range(0, len(item_ids[t])):
-            tentative_choice = choice(identities[t])
+            tentative_choice = identity_random.choice(identities[t])
             while True:
                 if not tentative_choice in identity_associations[t]:
                     identity_associations[t].append(tentative_choice)
                     break
                 else:
-                    tentative_choice = choice(identities[t])
+                    tentative_choice = identity_random.choice(identities[t])
+
+        for item_id, identity in zip(item_ids[t], identity_associations[t]):
+            if item_id in identified:
+                identity.identify()
 
 def get_identity(item):
     if "potion" in item.classification:
@@ -391,6 +402,19 @@ def get_identity(item):
     elif "wand" in item.classification:
         return identity_associations["wand"][item_ids["wand"].index(item.id)]
 
+def reassign_identities(entities, keep_identified=False):
+    # Points the items in entities and in their inventories at the identities of
+    # this process. Items that were loaded or made in another process come with
+    # copies of theirs; keep_identified is for a loaded game, whose copies know
+    # better than this process which kinds were identified.
+    for entity in entities:
+        for item in [entity] + (entity.inventory.items if entity.inventory else []):
+            if item.identity:
+                identity = get_identity(item)
+                if keep_identified:
+                    identity.identify(item.identity.identified)
+                item.identity = identity
+
 def get_item(item_choice, x, y, count=1):
     item = copy.deepcopy(item_defs.get(item_choice).get_item(x, y, count))
     if item.item.chargeable:
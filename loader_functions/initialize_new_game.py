@@ -6,10 +6,14 @@ from components.fighter import Fighter
 from components.hunger import Hunger
 from components.inventory import Inventory
 from components.level import Level
-from entity import Entity
+from entity import Entity, EntityList
 from game_messages import MessageLog
 from game_states import GameStates
+from loader_functions.data_loaders import floors_directory
+from loader_functions.entity_definitions import associate_identities
+from map_objects.floor_store import FloorStore
 from map_objects.game_map import GameMap
+from random_utils import get_run_seed, seed_streams
 from render_functions import RenderOrder
 from rpg_mechanics import advantage_roll
 
@@ -22,6 +26,12 @@ def get_constants():
     status_screen_width = 20
     status_screen_height = 50
 
+    # the most frames drawn per second; frames are only drawn when something changed
+    frame_cap = 30
+
+    # the run seed of new games, or None for a different run every time
+    seed = None
+
     panel_height = 6
     panel_y = screen_height - panel_height - 1
 
@@ -39,6 +49,22 @@ def get_constants():
     fov_algorithm = 0
     fov_light_walls = True
     fov_radius = 10
+
+    # monsters further than dormant_distance from the player only act every
+    # dormant_turns turns, until they come within wake_distance again
+    dormant_distance = 24
+    wake_distance = 16
+    dormant_turns = 8
+
+    # the game is saved in the background every autosave_turns turns and on every new floor
+    autosave_turns = 20
+
+    # the floors the player left are kept in floors_directory, and the floor below is
+    # made in a worker process ahead of time if prepare_floors is set
+    prepare_floors = True
+
+    # every action of a game is logged to the sessions directory, to be replayed
+    record_sessions = True
     
     colors = {
         'dark_wall': libtcod.darkest_sepia,
@@ -59,6 +85,8 @@ def get_constants():
         'window_title': window_title,
         'screen_width': screen_width,
         'screen_height': screen_height,
+        'frame_cap': frame_cap,
+        'seed': seed,
         'panel_height': panel_height,
         'panel_y': panel_y,
         'message_x': message_x,
@@ -72,6 +100,13 @@ def get_constants():
         'fov_algorithm': fov_algorithm,
         'fov_light_walls': fov_light_walls,
         'fov_radius': fov_radius,
+        'dormant_distance': dormant_distance,
+        'wake_distance': wake_distance,
+        'dormant_turns': dormant_turns,
+        'autosave_turns': autosave_turns,
+        'floors_directory': floors_directory,
+        'prepare_floors': prepare_floors,
+        'record_sessions': record_sessions,
         'colors': colors,
         'status_screen_width': status_screen_width,
         'status_screen_height': status_screen_height
@@ -80,7 +115,18 @@ def get_constants():
     return constants
 
 
+def start_run(constants):
+    # seeds the random streams and draws the identities of a new run
+    run_seed = constants['seed']
+    if run_seed is None:
+        run_seed = get_run_seed()
+
+    seed_streams(run_seed)
+    associate_identities()
+    return run_seed
+
 def get_game_variables(constants):
+    run_seed = start_run(constants)
     fighter_component = Fighter(
         advantage_roll(4, 3, 1, 6), advantage_roll(4, 3, 1, 6),
         advantage_roll(4, 3, 1, 6), advantage_roll(4, 3, 1, 6),
@@ -101,7 +147,7 @@ def get_game_variables(constants):
                     render_order=RenderOrder.ACTOR, fighter=fighter_component,
                     inventory=inventory_component, level=level_component,
                     equipment=equipment_component, hunger=hunger_component)
-    entities = [player]
+    entities = EntityList([player])
 
     equippable_component = Equippable("main_hand", hit_dice=[1, 4], enchantment=0)
     dagger = Entity("dagger", 0, 0, ')', libtcod.silver, 'dagger',
@@ -109,7 +155,10 @@ def get_game_variables(constants):
     player.inventory.add_item(dagger)
     player.equipment.toggle_equip(dagger)
 
-    game_map = GameMap(constants['map_width'], constants['map_height'])
+    game_map = GameMap(constants['map_width'], constants['map_height'], seed=run_seed)
+    # a new run replaces the saved one, floors and all
+    game_map.floors = FloorStore(constants['floors_directory'])
+    game_map.floors.clear()
     game_map.make_map(constants['max_rooms'], constants['room_min_size'],
                       constants['room_max_size'], constants['map_width'],
                       constants['map_height'], player, entities, True)
@@ -124,6 +173,7 @@ def get_game_variables(constants):
     return player, entities, game_map, message_log, game_state, turn, identities
 
 def get_test_map_variables(constants):
+    run_seed = start_run(constants)
     identities = {}
     
     fighter_component = Fighter(strength=11, dexterity=11, constitution=11, intelligence=11, wisdom=11, charisma=11, determination=1)
@@ -140,7 +190,7 @@ def get_test_map_variables(constants):
                     render_order=RenderOrder.ACTOR, fighter=fighter_component,
                     inventory=inventory_component, level=level_component,
                     equipment=equipment_component, hunger=hunger_component)
-    entities = [player]
+    entities = EntityList([player])
 
     equippable_component = Equippable("main_hand", hit_dice=[1, 4], enchantment=0)
     dagger = Entity("dagger", 0, 0, ')', libtcod.silver, 'dagger',
@@ -149,7 +199,7 @@ def get_test_map_variables(constants):
     player.inventory.add_item(dagger)
     player.equipment.toggle_equip(dagger)
     
-    game_map = GameMap(constants['map_width'], constants['map_height'])
+    game_map = GameMap(constants['map_width'], constants['map_height'], seed=run_seed)
     game_map.make_test_map(constants['map_width'], constants['map_height'], player,
                            entities, "test_map")
 
@@ -162,6 +212,7 @@ def get_test_map_variables(constants):
     return player, entities, game_map, message_log, game_state, turn, identities
 
 def get_tutorial_map_variables(constants):
+    run_seed = start_run(constants)
     identities = {}
 
     fighter_component = Fighter(11, 11, 11, 11, 11, 11, 1)
@@ -178,9 +229,9 @@ def get_tutorial_map_variables(constants):
                     render_order=RenderOrder.ACTOR, fighter=fighter_component,
                     inventory=inventory_component, level=level_component,
                     equipment=equipment_component, hunger=hunger_component)
-    entities = [player]
+    entities = EntityList([player])
 
-    game_map = GameMap(constants['map_width'], constants['map_height'])
+    game_map = GameMap(constants['map_width'], constants['map_height'], seed=run_seed)
     game_map.make_test_map(constants['map_width'], constants['map_height'],
                            player, entities, "tutorial_map")
 
@@ -0,0 +1,173 @@
+import copy
+import io
+import pickle
+import struct
+import zlib
+from enum import Enum
+
+from entity import Entity
+from loader_functions.entity_definitions import item_defs, monster_defs
+
+# Save files start with SAVE_MAGIC and the SAVE_VERSION they were written with,
+# followed by a zlib compressed pickle stream. Bump the version whenever a change
+# to the game's classes would break loading older saves.
+SAVE_MAGIC = b"DSAV"
+SAVE_VERSION = 3
+SAVE_HEADER = struct.Struct("<4sH")
+
+# Entities made from item_defs or monster_defs are not pickled whole. They are
+# saved as the id of their definition and the attributes that differ from a fresh
+# one, and everything that refers to them stores a number instead. Objects passed
+# as shared, like the player when a floor is stored without them, aren't saved at
+# all; references to them are pointed at the shared objects again on load.
+
+def get_definition(entity):
+    if entity.item and entity.id in item_defs:
+        return "item"
+    elif entity.id in monster_defs:
+        return "monster"
+    return None
+
+def get_prototype(kind, definition_id):
+    # what a freshly defined entity looks like, before anything rolled its charges,
+    # identity or AI
+    if kind == "item":
+        return item_defs[definition_id].get_item(0, 0)
+    return monster_defs[definition_id].get_monster(0, 0)
+
+def is_component(value):
+    return hasattr(value, "__dict__") and not callable(value) and not isinstance(value, Enum)
+
+def same_value(value, prototype_value):
+    if value is prototype_value:
+        return True
+    elif type(value) is not type(prototype_value):
+        return False
+    elif isinstance(value, (list, tuple)):
+        return (len(value) == len(prototype_value) and
+                all(same_value(a, b) for a, b in zip(value, prototype_value)))
+    elif isinstance(value, dict):
+        return (value.keys() == prototype_value.keys() and
+                all(same_value(value[key], prototype_value[key]) for key in value))
+    elif isinstance(value, Entity):
+        return False
+    elif is_component(value):
+        return same_state(vars(value), vars(prototype_value))
+    return value == prototype_value
+
+def same_state(state, prototype_state):
+    # owners point back at the entity and its prototype, which always differ
+    if state.keys() != prototype_state.keys():
+        return False
+    return all(key == "owner" or same_value(value, prototype_state[key])
+               for key, value in state.items())
+
+def get_delta(entity, prototype):
+    # The attributes of entity that differ from prototype. Components that only
+    # had a few of their fields change store just those fields.
+    fields = {}
+    components = {}
+    prototype_state = vars(prototype)
+
+    for name, value in entity.__getstate__().items():
+        prototype_value = prototype_state.get(name)
+        if same_value(value, prototype_value):
+            continue
+
+        if (is_component(value) and type(value) is type(prototype_value) and
+                not isinstance(value, Entity) and vars(value).keys() == vars(prototype_value).keys()):
+            prototype_component = vars(prototype_value)
+            components[name] = {key: field for key, field in vars(value).items()
+                                if key != "owner" and not same_value(field, prototype_component[key])}
+        else:
+            fields[name] = value
+
+    return fields, components
+
+class SavePickler(pickle.Pickler):
+    def __init__(self, file, shared=()):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.numbers = {}
+        self.defined_entities = []
+        self.shared = {id(obj): i for i, obj in enumerate(shared)}
+        # prototypes are only compared against here, so one of each will do
+        self.prototypes = {}
+
+    def persistent_id(self, obj):
+        if id(obj) in self.shared:
+            return ("shared", self.shared[id(obj)])
+        elif isinstance(obj, Entity) and get_definition(obj):
+            number = self.numbers.get(id(obj))
+            if number is None:
+                number = len(self.defined_entities)
+                self.numbers[id(obj)] = number
+                self.defined_entities.append(obj)
+            return number
+        return None
+
+    def dump_defined_entities(self):
+        # saving one entity can turn up others, like the items in its inventory
+        i = 0
+        while i < len(self.defined_entities):
+            entity = self.defined_entities[i]
+            kind = get_definition(entity)
+            if (kind, entity.id) not in self.prototypes:
+                self.prototypes[(kind, entity.id)] = get_prototype(kind, entity.id)
+            fields, components = get_delta(entity, self.prototypes[(kind, entity.id)])
+            self.dump((i, kind, entity.id, fields, components))
+            i += 1
+        self.dump(None)
+
+class SaveUnpickler(pickle.Unpickler):
+    def __init__(self, file, shared=()):
+        super().__init__(file)
+        self.defined_entities = {}
+        self.shared = shared
+
+    def persistent_load(self, number):
+        if isinstance(number, tuple):
+            return self.shared[number[1]]
+
+        # entities are filled in once their own record is read
+        if number not in self.defined_entities:
+            self.defined_entities[number] = Entity.__new__(Entity)
+        return self.defined_entities[number]
+
+    def load_defined_entities(self):
+        for number, kind, definition_id, fields, components in iter(self.load, None):
+            entity = self.persistent_load(number)
+            prototype = get_prototype(kind, definition_id)
+            # copying the prototype with entity in place of it points the owners at entity
+            state = copy.deepcopy(vars(prototype), {id(prototype): entity})
+            state.update(fields)
+            for name, component_fields in components.items():
+                for key, value in component_fields.items():
+                    setattr(state[name], key, value)
+            entity.__dict__.update(state)
+
+def dump_save(data, shared=()):
+    # Pickles data into the stream a save is made of. This is quick and takes a
+    # snapshot of the game, which write_save can then write out at any time.
+    stream = io.BytesIO()
+    pickler = SavePickler(stream, shared)
+    pickler.dump(data)
+    pickler.dump_defined_entities()
+    return stream.getvalue()
+
+def write_save(file, snapshot):
+    file.write(SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION))
+    file.write(zlib.compress(snapshot))
+
+def read_save(file, shared=()):
+    header = file.read(SAVE_HEADER.size)
+    if len(header) != SAVE_HEADER.size or SAVE_HEADER.unpack(header) != (SAVE_MAGIC, SAVE_VERSION):
+        raise ValueError("Not a save file of version {0}".format(SAVE_VERSION))
+
+    return load_save(zlib.decompress(file.read()), shared)
+
+def load_save(snapshot, shared=()):
+    # the data a dump_save snapshot was taken of
+    unpickler = SaveUnpickler(io.BytesIO(snapshot), shared)
+    data = unpickler.load()
+    unpickler.load_defined_entities()
+    return data
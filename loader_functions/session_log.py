@@ -0,0 +1,100 @@
+import base64
+import datetime
+import json
+import os
+import zlib
+
+from game_container import GameContainer
+from loader_functions.data_loaders import load_game_snapshot, snapshot_game
+from map_objects.floor_store import FloorStore
+
+# A session log is a text file of JSON lines. The first line holds the run seed,
+# the player's records and a snapshot of the game as the session started, along
+# with the floors it had stored; every line after it is the turn an action was
+# taken on and the action. Lines are only ever appended, so a log cut short by a
+# crash still replays up to where it stops.
+SESSION_LOG_VERSION = 1
+sessions_directory = "sessions"
+
+def get_session_filename():
+    current_time = datetime.datetime.now()
+    return os.path.join(sessions_directory,
+                        current_time.strftime("session_%Y_%m_%d_%H_%M_%S.log"))
+
+def encode_bytes(data):
+    return base64.b64encode(data).decode("ascii")
+
+def decode_bytes(text):
+    return base64.b64decode(text)
+
+class SessionRecorder:
+    def __init__(self, filename, engine):
+        game_map = engine.game_map
+        game = engine.game
+
+        floors = {}
+        if game_map.floors:
+            for dungeon_level in game_map.floors.levels:
+                if game_map.floors.has_floor(dungeon_level):
+                    with open(game_map.floors.get_filename(dungeon_level), 'rb') as floor_file:
+                        floors[dungeon_level] = encode_bytes(floor_file.read())
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(filename, 'w')
+        self.write({
+            "version": SESSION_LOG_VERSION,
+            "seed": game_map.seed,
+            "game": {"lowest_level": game.lowest_level, "high_score": game.high_score,
+                     "stat_diffs": list(game.stat_diffs), "points_available": game.points_available},
+            # the stored floors are save files, compressed already
+            "snapshot": encode_bytes(zlib.compress(snapshot_game(*engine.get_save_variables()))),
+            "floors": floors
+        })
+
+    def write(self, record):
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        # flushed every line, so nothing is lost if the game crashes
+        self.file.flush()
+
+    def record(self, turn, action):
+        self.write([turn, action])
+
+    def close(self):
+        self.file.close()
+
+def read_session(filename):
+    # the header and the (turn, action) records of a session log
+    with open(filename, 'r') as log_file:
+        header = json.loads(log_file.readline())
+        if header.get("version") != SESSION_LOG_VERSION:
+            raise ValueError("Not a session log of version {0}".format(SESSION_LOG_VERSION))
+
+        records = []
+        for line in log_file:
+            try:
+                turn, action = json.loads(line)
+            except ValueError:
+                # the last line of a log cut short
+                break
+            records.append((turn, action))
+
+    return header, records
+
+def start_session(header, floors_directory):
+    # The game and records a session started with. Its stored floors are written
+    # to floors_directory, so that replaying it doesn't touch the saved game's.
+    game_variables = load_game_snapshot(zlib.decompress(decode_bytes(header["snapshot"])))
+    game_map = game_variables[2]
+
+    if game_map.floors is not None:
+        game_map.floors = FloorStore(floors_directory)
+        os.makedirs(floors_directory, exist_ok=True)
+        for dungeon_level, floor in header["floors"].items():
+            with open(game_map.floors.get_filename(int(dungeon_level)), 'wb') as floor_file:
+                floor_file.write(decode_bytes(floor))
+            game_map.floors.levels.add(int(dungeon_level))
+
+    game = GameContainer(**header["game"])
+    return game_variables, game
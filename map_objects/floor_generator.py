@@ -0,0 +1,42 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+class FloorGenerator:
+    # Makes floors ahead of time in a worker process, so that taking the stairs
+    # only has to swap the prepared floor in. A worker process rather than a thread
+    # has the random module to itself, so a floor only depends on its seed.
+    def __init__(self):
+        self.executor = None
+        # key: future of the floor prepared under that key
+        self.pending = {}
+
+    def prepare(self, key, function, *args):
+        # only one floor is prepared at a time, and the one asked for last is the one needed
+        if key in self.pending:
+            return
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+        try:
+            if self.executor is None:
+                # spawned rather than forked, since the game has a window and threads open
+                self.executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"))
+            self.pending[key] = self.executor.submit(function, *args)
+        except (OSError, RuntimeError, BrokenProcessPool):
+            # without a worker, take makes the floor when it is needed
+            self.executor = None
+
+    def take(self, key, function, *args):
+        # the floor prepared under key, waiting for it if it isn't done yet, or
+        # made right away if it was never prepared
+        future = self.pending.pop(key, None)
+        if future is not None:
+            try:
+                return future.result()
+            except (OSError, BrokenProcessPool):
+                self.executor = None
+        return function(*args)
+
+floor_generator = FloorGenerator()
@@ -0,0 +1,31 @@
+import os
+import shutil
+
+from loader_functions.save_format import dump_save, read_save, write_save
+
+class FloorStore:
+    # The floors the player has left, each kept in its own file in directory in the
+    # same format as a save, so that only the current floor is in memory.
+    def __init__(self, directory):
+        self.directory = directory
+        self.levels = set()
+
+    def get_filename(self, dungeon_level):
+        return os.path.join(self.directory, "floor{0}.dat".format(dungeon_level))
+
+    def has_floor(self, dungeon_level):
+        return dungeon_level in self.levels and os.path.isfile(self.get_filename(dungeon_level))
+
+    def store(self, dungeon_level, floor, shared=()):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.get_filename(dungeon_level), 'wb') as data_file:
+            write_save(data_file, dump_save(floor, shared))
+        self.levels.add(dungeon_level)
+
+    def load(self, dungeon_level, shared=()):
+        with open(self.get_filename(dungeon_level), 'rb') as data_file:
+            return read_save(data_file, shared)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.levels.clear()
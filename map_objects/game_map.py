@@ -1,3 +1,5 @@
+import numpy as np
+import pickle
 import tcod as libtcod
 from components.door import Door, DoorPosition
 
@@ -7,21 +9,57 @@ from components.sign import Sign
 from components.stairs import Stairs
 from components.trap import Trap, poison_trap, teleport_trap, hole_trap, bear_trap, amnesia_trap
 from components.valuable import Valuable
-from entity import Entity, get_entities_at_location
+from entity import Entity, EntityList, get_entities_at_location
 from game_messages import Message
 from loader_functions.data_loaders import load_test_map_tiles, load_tutorial_map_tiles
-from loader_functions.entity_definitions import get_item, get_monster, item_defs, monster_defs
+from loader_functions.entity_definitions import get_item, get_monster, item_defs, monster_defs, reassign_identities
+from map_objects.floor_generator import floor_generator
+from map_objects.navigation_map import NavigationMap
 from map_objects.rectangle import Rect
-from map_objects.tile import Tile
-from random import randint, random, choice
-from random_utils import from_dungeon_level, random_choice_from_dict
+from map_objects.tile import TileGrid
+from random_utils import from_dungeon_level, get_run_seed, mapgen_random, random_choice_from_dict, seeded_streams
 from render_functions import RenderOrder
 
+# the per tile arrays of a GameMap, in the order they are saved
+TILE_ARRAYS = ("blocked", "block_sight", "window", "explored")
+# what a GameMap keeps of each floor in its FloorStore, besides the tiles
+FLOOR_ATTRIBUTES = ("rooms", "brightness", "test_map")
+
+def pack_tiles(arrays):
+    # the TILE_ARRAYS in arrays, saved as one bit per tile rather than a byte
+    return np.packbits(np.stack([arrays[name] for name in TILE_ARRAYS]))
+
+def unpack_tiles(tiles, width, height):
+    shape = (len(TILE_ARRAYS), width, height)
+    tiles = np.unpackbits(tiles, count=np.prod(shape)).reshape(shape)
+    return {name: np.asfortranarray(array, dtype=bool) for name, array in zip(TILE_ARRAYS, tiles)}
+
+def generate_floor(width, height, dungeon_level, spawned_dungeon_star, map_constants,
+                   downwards, floor_seed):
+    # Makes a new floor from floor_seed alone, so that it can be made in a worker
+    # process, and returns it pickled. The random streams of the caller are left as they were.
+    with seeded_streams(floor_seed):
+        game_map = GameMap(width, height, dungeon_level, seed=floor_seed)
+        game_map.spawned_dungeon_star = spawned_dungeon_star
+        # stands in for the player, who only matters for where they start
+        player = Entity("player", 0, 0, '@', libtcod.white, 'Player', blocks=True,
+                        render_order=RenderOrder.ACTOR)
+        entities = EntityList([player])
+        game_map.make_map(*map_constants, player, entities, downwards)
+        game_map.brightness = mapgen_random.randint(4, 12)
+
+    floor = {name: getattr(game_map, name) for name in FLOOR_ATTRIBUTES}
+    floor["tiles"] = pack_tiles(vars(game_map))
+    floor["entities"] = [entity for entity in entities if entity is not player]
+    floor["player_position"] = (player.x, player.y)
+    floor["spawned_dungeon_star"] = game_map.spawned_dungeon_star
+    return pickle.dumps(floor, pickle.HIGHEST_PROTOCOL)
+
 class GameMap:    
-    def __init__(self, width, height, dungeon_level=1, brightness = 10):
+    def __init__(self, width, height, dungeon_level=1, brightness = 10, seed=None):
         self.width = width
         self.height = height
-        self.tiles = self.initialize_tiles()
+        self.initialize_tiles()
         self.dungeon_level = dungeon_level
         self.rooms = []
         self.lowest_level = 32
@@ -31,15 +69,49 @@ class GameMap:
 
         self.dungeon_star_level = 24
         self.spawned_dungeon_star = False
+
+        # where the floors left behind are kept; without one, every floor is new
+        self.floors = None
+        # the run seed, which the random streams and each new floor are seeded from
+        self.seed = seed if seed is not None else get_run_seed()
         
     def initialize_tiles(self):
-        tiles = [[Tile(True) for y in range(self.height)] for x in range(self.width)]
-        return tiles
+        # tile data is indexed [x, y], the same way as tiles[x][y]
+        self.blocked = np.ones((self.width, self.height), dtype=bool, order="F")
+        self.block_sight = np.ones((self.width, self.height), dtype=bool, order="F")
+        self.window = np.zeros((self.width, self.height), dtype=bool, order="F")
+        self.explored = np.zeros((self.width, self.height), dtype=bool, order="F")
+        self.navigation = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the navigation map holds tcod handles and is rebuilt every turn anyway
+        state["navigation"] = None
+        state["tiles"] = pack_tiles(state)
+        for name in TILE_ARRAYS:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        state.update(unpack_tiles(state.pop("tiles"), state["width"], state["height"]))
+        self.__dict__.update(state)
+
+    @property
+    def tiles(self):
+        return TileGrid(self)
+
+    def refresh_navigation(self, entities):
+        self.navigation = NavigationMap(self, entities)
+        return self.navigation
+
+    def get_navigation(self, entities):
+        # outside of a turn that refreshed it, build a throwaway navigation map
+        if self.navigation is None:
+            return NavigationMap(self, entities)
+        return self.navigation
 
     def is_blocked(self, x, y):
-        if self.tiles[x][y].blocked:
-            return True
-        return False
+        return bool(self.blocked[x, y])
 
     def place_entities(self, room, entities):
         max_monsters_per_room = from_dungeon_level([[2, 1], [3, 15], [4, 20]], self.dungeon_level)
@@ -48,14 +120,14 @@ class GameMap:
         chance_to_spawn_monsters = 0.33
         chance_to_spawn_items = 0.40
         
-        number_of_monsters = randint(1, max_monsters_per_room)
-        number_of_items = randint(1, max_items_per_room)
-        amount_of_gold = randint(0, 20 + (10 * self.dungeon_level)) + 2
+        number_of_monsters = mapgen_random.randint(1, max_monsters_per_room)
+        number_of_items = mapgen_random.randint(1, max_items_per_room)
+        amount_of_gold = mapgen_random.randint(0, 20 + (10 * self.dungeon_level)) + 2
 
         gold_passes = 0
-        if random() < 0.02:
+        if mapgen_random.random() < 0.02:
             gold_passes = 2
-        elif random() < 0.12:
+        elif mapgen_random.random() < 0.12:
             gold_passes = 1
 
         monster_chances = {}
@@ -66,23 +138,23 @@ class GameMap:
         for key, value in item_defs.items():
             item_chances[key] = from_dungeon_level(value.spawn_rate, self.dungeon_level)
 
-        if random() < chance_to_spawn_monsters:
+        if mapgen_random.random() < chance_to_spawn_monsters:
             for i in range(number_of_monsters):
-                x = randint(room.x1 + 1, room.x2 - 1)
-                y = randint(room.y1 + 1, room.y2 - 1)
+                x = mapgen_random.randint(room.x1 + 1, room.x2 - 1)
+                y = mapgen_random.randint(room.y1 + 1, room.y2 - 1)
 
-                if not any([entity for entity in entities if entity.x == x and entity.y == y]):
+                if not get_entities_at_location(entities, x, y):
                     if not self.is_blocked(x, y):
                         monster_choice = random_choice_from_dict(monster_chances)
                         monster = get_monster(monster_choice, x, y)
                         entities.append(monster)
 
-        if random() < chance_to_spawn_items:
+        if mapgen_random.random() < chance_to_spawn_items:
             for i in range(number_of_items):
-                x = randint(room.x1 + 1, room.x2 - 1)
-                y = randint(room.y1 + 1, room.y2 - 1)
+                x = mapgen_random.randint(room.x1 + 1, room.x2 - 1)
+                y = mapgen_random.randint(room.y1 + 1, room.y2 - 1)
 
-                if not any([entity for entity in entities if entity.x == x and entity.y == y]):
+                if not get_entities_at_location(entities, x, y):
                     if not self.is_blocked(x, y):                        
                         if self.dungeon_level == self.dungeon_star_level and not self.spawned_dungeon_star:
                             self.spawned_dungeon_star = True
@@ -97,12 +169,12 @@ class GameMap:
             if amount_of_gold == 0:
                 break
             
-            x = randint(room.x1 + 1, room.x2 - 1)
-            y = randint(room.y1 + 1, room.y2 - 1)
+            x = mapgen_random.randint(room.x1 + 1, room.x2 - 1)
+            y = mapgen_random.randint(room.y1 + 1, room.y2 - 1)
 
-            if not any([entity for entity in entities if entity.x == x and entity.y == y]):
+            if not get_entities_at_location(entities, x, y):
                 if not self.is_blocked(x, y):
-                    take_gold = randint(0, amount_of_gold)
+                    take_gold = mapgen_random.randint(0, amount_of_gold)
                     amount_of_gold -= take_gold
                     if take_gold < 20:
                         gold = Entity("gold", x, y, '$', libtcod.dark_sepia, 'Copper',
@@ -127,10 +199,8 @@ class GameMap:
         y = 1
         
         new_room = Rect(x, y, w, h)
-        for ax in range(x, x + w):
-            for ay in range(y, y + h):
-                self.tiles[ax][ay].blocked = False
-                self.tiles[ax][ay].block_sight = False
+        self.blocked[x:x + w, y:y + h] = False
+        self.block_sight[x:x + w, y:y + h] = False
         
         (new_x, new_y) = new_room.center()
                 
@@ -147,12 +217,12 @@ class GameMap:
                 if data[data_y][data_x] != '':
                     piece = data[data_y][data_x]
                     if piece == "wall":
-                        self.tiles[data_x][data_y].blocked = True
-                        self.tiles[data_x][data_y].block_sight = True
+                        self.blocked[data_x, data_y] = True
+                        self.block_sight[data_x, data_y] = True
                     elif piece == "window":
-                        self.tiles[data_x][data_y].blocked = True
-                        self.tiles[data_x][data_y].block_sight = False
-                        self.tiles[data_x][data_y].window = True
+                        self.blocked[data_x, data_y] = True
+                        self.block_sight[data_x, data_y] = False
+                        self.window[data_x, data_y] = True
                     elif piece == "player":
                         player.x = data_x
                         player.y = data_y
@@ -174,7 +244,7 @@ class GameMap:
                         door.door.close_door(self.tiles[data_x][data_y])
                         entities.append(door)
                     elif piece == "glass_door":
-                        self.tiles[data_x][data_y].window = True
+                        self.window[data_x, data_y] = True
                         door_component = Door(False, DoorPosition.VERTICAL, True)
                         door = Entity("door", data_x, data_y, "+", libtcod.dark_blue,
                                              'Door', blocks=True, render_order=RenderOrder.DOOR,
@@ -226,65 +296,138 @@ class GameMap:
                     else:
                         print("id \"{0}\" not recognized, could not load.".format(piece))
         
-    def next_floor(self, player, message_log, constants, downwards, took_stairs=True):
+    def next_floor(self, player, entities, message_log, constants, downwards, took_stairs=True):
+        previous_level = self.dungeon_level
+        if self.floors:
+            self.store_floor(player, entities)
+
         if downwards:
             self.dungeon_level += 1
         else:
             self.dungeon_level -= 1
-        
-        entities = [player]
 
-        self.tiles = self.initialize_tiles()
-        self.make_map(constants['max_rooms'], constants['room_min_size'], constants['room_max_size'],
-                      constants['map_width'], constants['map_height'], player, entities, downwards)
-        self.brightness = randint(4, 12)
+        if self.floors and self.floors.has_floor(self.dungeon_level):
+            entities = self.load_floor(player, previous_level, took_stairs)
+        else:
+            entities = self.make_floor(player, constants, downwards)
 
         if took_stairs:
             player.fighter.heal(player.fighter.max_hp // 5)
             message_log.add_message(Message('You take a moment to rest, and recover your strength.',
                                             libtcod.light_violet))
-            
+
+        self.prepare_next_floor(constants)
+        return entities
+
+    def get_floor_seed(self, dungeon_level, downwards):
+        # a string, like the seeds of seed_streams, so that it is the same on every build
+        return "{0}:floor:{1}:{2}".format(self.seed, dungeon_level, downwards)
+
+    def get_floor_arguments(self, dungeon_level, constants, downwards):
+        # the key the floor is prepared under, and what generate_floor makes it from
+        map_constants = (constants['max_rooms'], constants['room_min_size'], constants['room_max_size'],
+                         constants['map_width'], constants['map_height'])
+        floor_seed = self.get_floor_seed(dungeon_level, downwards)
+        return (floor_seed, generate_floor, self.width, self.height, dungeon_level,
+                self.spawned_dungeon_star, map_constants, downwards, floor_seed)
+
+    def prepare_next_floor(self, constants):
+        # start making the floor below in the background, unless it was made already
+        dungeon_level = self.dungeon_level + 1
+        if constants['prepare_floors'] and dungeon_level <= self.lowest_level and not (self.floors and self.floors.has_floor(dungeon_level)):
+            floor_generator.prepare(*self.get_floor_arguments(dungeon_level, constants, True))
+
+    def make_floor(self, player, constants, downwards):
+        floor = pickle.loads(floor_generator.take(*self.get_floor_arguments(self.dungeon_level, constants, downwards)))
+        entities = self.set_floor(player, floor)
+        player.place(*floor["player_position"])
+        if floor["spawned_dungeon_star"]:
+            self.spawned_dungeon_star = True
+
+        reassign_identities(entities)
+        return entities
+
+    def set_floor(self, player, floor):
+        for name in FLOOR_ATTRIBUTES:
+            setattr(self, name, floor[name])
+        for name, array in unpack_tiles(floor["tiles"], self.width, self.height).items():
+            setattr(self, name, array)
+        self.navigation = None
+
+        entities = EntityList([player] + floor["entities"])
+        if "scheduler" in floor:
+            entities.scheduler = floor["scheduler"]
+        return entities
+
+    def store_floor(self, player, entities):
+        # the player goes with them to the next floor, so it isn't stored
+        floor = {name: getattr(self, name) for name in FLOOR_ATTRIBUTES}
+        floor["tiles"] = pack_tiles(vars(self))
+        floor["entities"] = [entity for entity in entities if entity is not player]
+        floor["scheduler"] = entities.scheduler
+        self.floors.store(self.dungeon_level, floor, (player,))
+
+    def load_floor(self, player, previous_level, took_stairs):
+        entities = self.set_floor(player, self.floors.load(self.dungeon_level, (player,)))
+        reassign_identities(entities)
+
+        # arrive on the stairs that lead back, or somewhere in a room after a fall
+        for entity in entities.with_component("stairs"):
+            if took_stairs and entity.stairs.floor == previous_level:
+                player.place(entity.x, entity.y)
+                break
+        else:
+            player.place(*mapgen_random.choice(self.rooms).center())
+
         return entities
     
     def vline(self, x, y1, y2):
         if y1 > y2:
             y1,y2 = y2,y1
-            
-        for y in range(y1,y2+1):
-            self.tiles[x][y].blocked = False
-            self.tiles[x][y].block_sight = False
-            
+
+        self.blocked[x, y1:y2 + 1] = False
+        self.block_sight[x, y1:y2 + 1] = False
+
     def vline_up(self, x, y):
-        while y >= 0 and self.tiles[x][y].blocked == True:
-            self.tiles[x][y].blocked = False
-            self.tiles[x][y].block_sight = False
-            y -= 1
- 
+        if y < 0:
+            return
+
+        # carve upwards until the first open tile
+        open_tiles = np.flatnonzero(~self.blocked[x, :y + 1])
+        y1 = open_tiles[-1] + 1 if len(open_tiles) else 0
+        self.blocked[x, y1:y + 1] = False
+        self.block_sight[x, y1:y + 1] = False
+
     def vline_down(self, x, y):
-        while y < self.height and self.tiles[x][y].blocked == True:
-            self.tiles[x][y].blocked = False
-            self.tiles[x][y].block_sight = False
-            y += 1
- 
+        # carve downwards until the first open tile
+        open_tiles = np.flatnonzero(~self.blocked[x, y:])
+        y2 = y + open_tiles[0] if len(open_tiles) else self.height
+        self.blocked[x, y:y2] = False
+        self.block_sight[x, y:y2] = False
+
     def hline(self, x1, y, x2):
         if x1 > x2:
             x1,x2 = x2,x1
-            
-        for x in range(x1,x2+1):
-            self.tiles[x][y].blocked = False
-            self.tiles[x][y].block_sight = False
- 
+
+        self.blocked[x1:x2 + 1, y] = False
+        self.block_sight[x1:x2 + 1, y] = False
+
     def hline_left(self, x, y):
-        while x >= 0 and self.tiles[x][y].blocked == True:
-            self.tiles[x][y].blocked = False
-            self.tiles[x][y].block_sight = False
-            x -= 1
- 
+        if x < 0:
+            return
+
+        # carve left until the first open tile
+        open_tiles = np.flatnonzero(~self.blocked[:x + 1, y])
+        x1 = open_tiles[-1] + 1 if len(open_tiles) else 0
+        self.blocked[x1:x + 1, y] = False
+        self.block_sight[x1:x + 1, y] = False
+
     def hline_right(self, x, y):
-        while x < self.width and self.tiles[x][y].blocked == True:
-            self.tiles[x][y].blocked = False
-            self.tiles[x][y].block_sight = False
-            x += 1
+        # carve right until the first open tile
+        open_tiles = np.flatnonzero(~self.blocked[x:, y])
+        x2 = x + open_tiles[0] if len(open_tiles) else self.width
+        self.blocked[x:x2, y] = False
+        self.block_sight[x:x2, y] = False
 
     def make_map(self, max_rooms, room_min_size, room_max_size,
                  map_width, map_height, player, entities, downwards):
@@ -299,6 +442,8 @@ class GameMap:
             min_height=room_min_size + 1,
             max_horizontal_ratio=1.5,
             max_vertical_ratio=1.5,
+            # seeded from the mapgen stream, so a seeded floor always splits the same way
+            seed=libtcod.random.Random(libtcod.random.MERSENNE_TWISTER, mapgen_random.getrandbits(31)),
         )
         
         center_of_last_room_x = None
@@ -315,9 +460,9 @@ class GameMap:
                 
                 if node.horizontal:
                     if left.x + left.w - 1 < right.x or right.x + right.w - 1 < left.x:
-                        x1 = randint(left.x, left.x + left.w - 1)
-                        x2 = randint(right.x, right.x + right.w - 1)
-                        y = randint(left.y + left.h, right.y)
+                        x1 = mapgen_random.randint(left.x, left.x + left.w - 1)
+                        x2 = mapgen_random.randint(right.x, right.x + right.w - 1)
+                        y = mapgen_random.randint(left.y + left.h, right.y)
 
                         self.vline_up(x1, y - 1)
                         self.hline(x1, y, x2)
@@ -326,7 +471,7 @@ class GameMap:
                     else:
                         minx = max(left.x, right.x)
                         maxx = min(left.x + left.w - 1, right.x + right.w - 1)
-                        x = randint(minx, maxx)
+                        x = mapgen_random.randint(minx, maxx)
                         
                         # catch out-of-bounds attempts
                         while x > map_width - 1:
@@ -337,9 +482,9 @@ class GameMap:
  
                 else:
                     if left.y + left.h - 1 < right.y or right.y + right.h - 1 < left.y:
-                        y1 = randint(left.y, left.y + left.h - 1)
-                        y2 = randint(right.y, right.y + right.h - 1)
-                        x = randint(left.x + left.w, right.x)
+                        y1 = mapgen_random.randint(left.y, left.y + left.h - 1)
+                        y2 = mapgen_random.randint(right.y, right.y + right.h - 1)
+                        x = mapgen_random.randint(left.x + left.w, right.x)
                         
                         self.hline_left(x - 1, y1)
                         self.vline(x, y1, y2)
@@ -347,7 +492,7 @@ class GameMap:
                     else:
                         miny = max(left.y, right.y)
                         maxy = min(left.y + left.h - 1, right.y + right.h - 1)
-                        y = randint(miny, maxy)
+                        y = mapgen_random.randint(miny, maxy)
                         
                         # catch out-of-bounds attempts
                         while y > map_height - 1:
@@ -368,21 +513,19 @@ class GameMap:
                     max_y -= 1
                 
                 if not full_rooms:
-                    min_x = randint(min_x, max_x - room_min_size + 1)
-                    min_y = randint(min_y, max_y - room_min_size + 1)
-                    max_x = randint(min_x + room_min_size - 2, max_x)
-                    max_y = randint(min_y + room_min_size - 2, max_y)
+                    min_x = mapgen_random.randint(min_x, max_x - room_min_size + 1)
+                    min_y = mapgen_random.randint(min_y, max_y - room_min_size + 1)
+                    max_x = mapgen_random.randint(min_x + room_min_size - 2, max_x)
+                    max_y = mapgen_random.randint(min_y + room_min_size - 2, max_y)
 
                 node.x = min_x
                 node.y = min_y
                 node.w = max_x - min_x + 1
                 node.h = max_y - min_y + 1
 
-                for x in range(min_x, max_x + 1):
-                    for y in range(min_y, max_y + 1):
-                        self.tiles[x][y].blocked = False
-                        self.tiles[x][y].block_sight = False
-                    
+                self.blocked[min_x:max_x + 1, min_y:max_y + 1] = False
+                self.block_sight[min_x:max_x + 1, min_y:max_y + 1] = False
+
                 new_room = Rect(node.x, node.y, node.w, node.h)
                 self.rooms.append(new_room)
                 
@@ -391,34 +534,29 @@ class GameMap:
                 center_of_last_room_y = new_y
 
         # wall off map from exiting bounds
-        for x in range(0, self.width):
-            self.tiles[x][0].blocked = True
-            self.tiles[x][0].block_sight = True
-            self.tiles[x][self.height - 1].blocked = True
-            self.tiles[x][self.height - 1].block_sight = True
-        for y in range(0, self.height):
-            self.tiles[0][y].blocked = True
-            self.tiles[0][y].block_sight = True
-            self.tiles[self.width - 1][y].blocked = True
-            self.tiles[self.width - 1][y].block_sight = True
+        for tile_array in (self.blocked, self.block_sight):
+            tile_array[:, 0] = True
+            tile_array[:, self.height - 1] = True
+            tile_array[0, :] = True
+            tile_array[self.width - 1, :] = True
                 
-        player_room = choice(self.rooms)
+        player_room = mapgen_random.choice(self.rooms)
         (player.x, player.y) = player_room.center()
 
         for r in self.rooms:
             self.place_entities(r, entities)
 
         max_traps_per_floor = from_dungeon_level([[5, 1], [10, 6], [15, 11]], self.dungeon_level)
-        number_of_traps = randint(1, max_traps_per_floor)
+        number_of_traps = mapgen_random.randint(1, max_traps_per_floor)
 
         for i in range(number_of_traps):
-            trap_room = choice(self.rooms)
-            x = randint(trap_room.x1 + 1, trap_room.x2 - 1)
-            y = randint(trap_room.y1 + 1, trap_room.y2 - 1)
+            trap_room = mapgen_random.choice(self.rooms)
+            x = mapgen_random.randint(trap_room.x1 + 1, trap_room.x2 - 1)
+            y = mapgen_random.randint(trap_room.y1 + 1, trap_room.y2 - 1)
 
-            if not any([entity for entity in entities if entity.x == x and entity.y == y]):
+            if not get_entities_at_location(entities, x, y):
                 if not self.is_blocked(x, y):
-                    trap_chance = random()
+                    trap_chance = mapgen_random.random()
                     if trap_chance < .03:
                         trap_component = Trap(poison_trap)
                         trap = Entity("trap", x, y, " ", libtcod.dark_lime,
@@ -454,16 +592,16 @@ class GameMap:
         entities_blocking_stairs = get_entities_at_location(entities, center_of_last_room_x, center_of_last_room_y)
         for e in entities_blocking_stairs:
             if e.id == "player":
-                random_x = e.x + randint(0, 2) - 1
-                random_y = e.y + randint(0, 2) - 1
+                random_x = e.x + mapgen_random.randint(0, 2) - 1
+                random_y = e.y + mapgen_random.randint(0, 2) - 1
                 if random_x != e.x and random_y != e.y:
                     e.move_towards(random_x, random_y, self, entities)
 
                     while e.x == center_of_last_room_x and e.y == center_of_last_room_y:
-                        random_x = e.x + randint(0, 2) - 1
-                        random_y = e.y + randint(0, 2) - 1
+                        random_x = e.x + mapgen_random.randint(0, 2) - 1
+                        random_y = e.y + mapgen_random.randint(0, 2) - 1
                         if random_x != e.x and random_y != e.y:
-                            e.move_towards(random_x, random_y, game_map, entities)
+                            e.move_towards(random_x, random_y, self, entities)
             else:
                 entities.remove(e)
 
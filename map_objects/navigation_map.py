@@ -0,0 +1,146 @@
+import numpy as np
+import tcod as libtcod
+
+# distance map units, with the usual 1.41 diagonal cost of moving
+CARDINAL_COST = 100
+DIAGONAL_COST = 141
+
+# Brogue's flee map: the approach map scaled by this, then rescanned
+SAFETY_COEFFICIENT = -1.2
+
+NEIGHBOURS = [(-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+class NavigationMap:
+    # Walkability grid shared by every monster during a turn. It is built once
+    # from the tile arrays and the blocking entities, then patched as entities
+    # move, instead of being rebuilt for every monster.
+    def __init__(self, game_map, entities):
+        self.game_map = game_map
+        self.blockers = np.zeros((game_map.width, game_map.height), dtype=np.int16, order="F")
+        self.blocker_positions = {}
+        # blockers that never move on their own, like closed doors
+        self.static_blockers = np.zeros((game_map.width, game_map.height), dtype=bool, order="F")
+
+        for entity in entities:
+            if entity.blocks:
+                self.blocker_positions[entity] = (entity.x, entity.y)
+                self.blockers[entity.x, entity.y] += 1
+                if not (entity.ai or entity.fighter):
+                    self.static_blockers[entity.x, entity.y] = True
+
+        self.fov = libtcod.map_new(game_map.width, game_map.height)
+        self.fov.walkable[...] = ~(game_map.blocked | (self.blockers > 0)).T
+
+        self.approach_map = None
+        self.approach_target = None
+        self.safety_map = None
+        self.within_reach = None
+        self.safety_target = None
+
+    def refresh_cell(self, x, y):
+        self.fov.walkable[y, x] = not self.game_map.blocked[x, y] and self.blockers[x, y] == 0
+
+    def add_blocker(self, x, y):
+        self.blockers[x, y] += 1
+        self.refresh_cell(x, y)
+
+    def remove_blocker(self, x, y):
+        self.blockers[x, y] -= 1
+        self.refresh_cell(x, y)
+
+    def update(self, entity):
+        # call after an entity moves, spawns, dies or stops blocking
+        old_position = self.blocker_positions.pop(entity, None)
+        if old_position is not None:
+            self.remove_blocker(*old_position)
+
+        if entity.blocks:
+            self.blocker_positions[entity] = (entity.x, entity.y)
+            self.add_blocker(entity.x, entity.y)
+
+    def remove(self, entity):
+        old_position = self.blocker_positions.pop(entity, None)
+        if old_position is not None:
+            self.remove_blocker(*old_position)
+
+    def get_approach_map(self, target):
+        # Distance from every tile to the target, flooded once and reused by every
+        # monster hunting it this turn. Monsters are left out of the cost so the
+        # map stays valid while they move; they are checked when stepping instead.
+        if self.approach_target != (target.x, target.y):
+            cost = ~self.game_map.blocked & ~self.static_blockers
+            cost[target.x, target.y] = True
+
+            self.approach_map = libtcod.path.maxarray((self.game_map.width, self.game_map.height),
+                                                      order="F")
+            self.approach_map[target.x, target.y] = 0
+            libtcod.path.dijkstra2d(self.approach_map, cost, CARDINAL_COST, DIAGONAL_COST,
+                                    out=self.approach_map)
+            self.approach_target = (target.x, target.y)
+
+        return self.approach_map
+
+    def get_safety_map(self, target):
+        # Negating the approach map makes the tiles far from the target the lowest;
+        # rescanning it lets monsters in dead ends find their way around the target
+        # to the open areas behind it, instead of backing into a corner.
+        if self.safety_target != (target.x, target.y):
+            approach_map = self.get_approach_map(target)
+            unreachable = approach_map == np.iinfo(approach_map.dtype).max
+            cost = ~self.game_map.blocked & ~self.static_blockers
+
+            self.safety_map = np.where(unreachable, approach_map,
+                                       approach_map * SAFETY_COEFFICIENT).astype(approach_map.dtype)
+            libtcod.path.dijkstra2d(self.safety_map, cost, CARDINAL_COST, DIAGONAL_COST,
+                                    out=self.safety_map)
+            # tiles the target could attack from where it stands
+            self.within_reach = approach_map <= DIAGONAL_COST
+            self.safety_target = (target.x, target.y)
+
+        return self.safety_map
+
+    def downhill_step(self, distance_map, x, y, avoid=None):
+        best_step = None
+        best_distance = distance_map[x, y]
+        for (dx, dy) in NEIGHBOURS:
+            step_x = x + dx
+            step_y = y + dy
+            if 0 <= step_x < self.game_map.width and 0 <= step_y < self.game_map.height:
+                if avoid is not None and avoid[step_x, step_y]:
+                    continue
+                if distance_map[step_x, step_y] < best_distance and self.fov.walkable[step_y, step_x]:
+                    best_step = (step_x, step_y)
+                    best_distance = distance_map[step_x, step_y]
+
+        return best_step
+
+    def approach_step(self, entity, target, max_path_size):
+        approach_map = self.get_approach_map(target)
+        distance = approach_map[entity.x, entity.y]
+
+        # Unreachable, or the path is max_path_size steps or longer. A path of n steps
+        # costs between n cardinal and n diagonal moves, so only the paths in between
+        # need to be walked to be counted.
+        if distance == np.iinfo(approach_map.dtype).max or distance >= max_path_size * DIAGONAL_COST:
+            return None
+        if distance >= max_path_size * CARDINAL_COST:
+            path = libtcod.path.hillclimb2d(approach_map, (entity.x, entity.y), True, True)
+            if len(path) - 1 >= max_path_size:
+                return None
+
+        return self.downhill_step(approach_map, entity.x, entity.y)
+
+    def flee_step(self, entity, target, safe_range):
+        approach_map = self.get_approach_map(target)
+        distance = approach_map[entity.x, entity.y]
+
+        # the target can't reach us, or has to walk at least safe_range steps
+        if distance == np.iinfo(approach_map.dtype).max or distance >= safe_range * CARDINAL_COST:
+            return None
+
+        safety_map = self.get_safety_map(target)
+
+        # running around the target is fine, running past it within its reach is not
+        if self.within_reach[entity.x, entity.y]:
+            return self.downhill_step(safety_map, entity.x, entity.y)
+        return self.downhill_step(safety_map, entity.x, entity.y, self.within_reach)
@@ -1,11 +1,42 @@
+def tile_property(name):
+    def getter(self):
+        return bool(getattr(self.game_map, name)[self.x, self.y])
+
+    def setter(self, value):
+        getattr(self.game_map, name)[self.x, self.y] = bool(value)
+
+    return property(getter, setter)
 
 class Tile:
-    def __init__(self, blocked, block_sight=None, window=None):
-        self.blocked = blocked
+    # A view of a single cell in the GameMap's tile arrays, so code written
+    # against game_map.tiles[x][y] keeps reading and writing the same data.
+    def __init__(self, game_map, x, y):
+        self.game_map = game_map
+        self.x = x
+        self.y = y
+
+    blocked = tile_property("blocked")
+    block_sight = tile_property("block_sight")
+    window = tile_property("window")
+    explored = tile_property("explored")
+
+class TileColumn:
+    def __init__(self, game_map, x):
+        self.game_map = game_map
+        self.x = x
+
+    def __getitem__(self, y):
+        return Tile(self.game_map, self.x, y)
+
+    def __len__(self):
+        return self.game_map.height
+
+class TileGrid:
+    def __init__(self, game_map):
+        self.game_map = game_map
 
-        if block_sight is None:
-            block_sight = blocked
+    def __getitem__(self, x):
+        return TileColumn(self.game_map, x)
 
-        self.block_sight = block_sight
-        self.window = window
-        self.explored = False
+    def __len__(self):
+        return self.game_map.width
@@ -1,5 +1,6 @@
 import tcod as libtcod
 
+from game_messages import SCROLLBACK_WIDTH, SCROLLBACK_HEIGHT
 from rpg_mechanics import display_ability
 
 def menu(con, header, options, width, screen_width, screen_height):
@@ -252,10 +253,12 @@ def help_screen(help_screen_width, screen_width, screen_height):
         '            ;   look at entity',
         "            x   butcher corpse (%)",
         "            s   search for traps",
+        "     Ctrl + p   show previous messages",
         "",
         "     Ctrl + s   save and exit game",
         "     Ctrl + q   exit game without saving",
-        "     Ctrl + f   toggle fullscreen"
+        "     Ctrl + f   toggle fullscreen",
+        "           F4   toggle turn timings"
     ]
 
     help_screen_height = len(help_items) + 7
@@ -300,3 +303,24 @@ def help_screen(help_screen_width, screen_width, screen_height):
     
     libtcod.console_blit(window, 0, 0, help_screen_width,
                          help_screen_height, 0, x, y, 1.0, 0.8)
+
+def message_log_screen(message_log, screen_width, screen_height):
+    message_log_width = SCROLLBACK_WIDTH + 2
+    message_log_height = SCROLLBACK_HEIGHT + 4
+    window = libtcod.console_new(message_log_width, message_log_height)
+    libtcod.console_set_default_foreground(window, libtcod.white)
+    libtcod.console_set_background_flag(window, libtcod.BKGND_OVERLAY)
+    libtcod.console_set_default_background(window, libtcod.darkest_grey)
+    libtcod.console_rect(window, 0, 0, message_log_width, message_log_height, True)
+
+    libtcod.console_print_ex(window, 1, 1, libtcod.BKGND_NONE, libtcod.LEFT,
+                             "Messages (up/down or PgUp/PgDn to scroll, Esc to exit)")
+
+    lines = message_log.get_lines(SCROLLBACK_WIDTH, SCROLLBACK_HEIGHT, message_log.scroll)
+    for i, (text, color) in enumerate(lines):
+        libtcod.console_set_default_foreground(window, color)
+        libtcod.console_print_ex(window, 1, i + 3, libtcod.BKGND_NONE, libtcod.LEFT, text)
+
+    x = screen_width // 2 - message_log_width // 2
+    y = screen_height // 2 - message_log_height // 2
+    libtcod.console_blit(window, 0, 0, message_log_width, message_log_height, 0, x, y, 1.0, 0.9)
@@ -1,8 +1,8 @@
 from enum import Enum
 import json
 import os
-import random
 import textwrap
+from random_utils import plot_random
 
 fantasy_name_file = "assets/fantasy_name_list.json"
 
@@ -55,7 +55,7 @@ class Mdict:
             
     def get_suffix(self,prefix):
         l = self[prefix]
-        return random.choice(l)  
+        return plot_random.choice(l)  
 
 class MName:
     """
@@ -109,7 +109,7 @@ def get_town_name():
     return MName(PLACES).New()
 
 class Character:
-    def __init__(self, last_name=None, alive=random.choice([True, False])):
+    def __init__(self, last_name=None, alive=plot_random.choice([True, False])):
         self.first_name = get_name()
         # 50% chance to get parent's last name
         if last_name == None:
@@ -117,19 +117,19 @@ class Character:
         else:
             self.last_name = last_name
         # 33% chance to have any sex
-        self.sex = Sex(random.randint(0, 2))
+        self.sex = Sex(plot_random.randint(0, 2))
         # 50% for parent to be dead by now
         self.alive = alive
         # 10% to not have a home
-        if random.random() < .1:
+        if plot_random.random() < .1:
             self.location = None
         else:
             self.location = get_town_name()
         # 5% to not have a profession
-        if random.random() < .05:
+        if plot_random.random() < .05:
             self.profession = None
         else:
-            self.profession = random.choice(PROFESSIONS)
+            self.profession = plot_random.choice(PROFESSIONS)
 
     @property
     def name(self):
@@ -140,11 +140,11 @@ class Plot:
         self.protagonist = Character(alive=True)
 
         # %20 to be an orphan
-        if random.random() < .2:
+        if plot_random.random() < .2:
             self.parent = None
         else:
             # 50% for parent to share last name
-            if random.random() < 0.5:
+            if plot_random.random() < 0.5:
                 self.parent = Character()
             else:
                 self.parent = Character(last_name=self.protagonist.last_name)
@@ -0,0 +1,66 @@
+import datetime
+import time
+from collections import deque
+
+# The parts of the game that are timed. Some are part of others: floors and fov
+# happen during the player's actions, ai is each monster's share of enemies.
+SYSTEMS = ("player", "floors", "fov", "enemies", "ai", "tick", "render", "flush")
+# how many of the latest times of each system the percentiles are taken over
+PROFILE_WINDOW = 200
+PERCENTILES = (50, 90, 99)
+
+def get_profile_filename():
+    current_time = datetime.datetime.now()
+    return current_time.strftime("profile_%Y_%m_%d_%H_%M_%S.txt")
+
+def format_milliseconds(seconds):
+    # fits in the three characters the overlay has for each number
+    milliseconds = seconds * 1000
+    if milliseconds < 10:
+        return "{0:.1f}".format(milliseconds)
+    elif milliseconds < 1000:
+        return "{0:.0f}".format(milliseconds)
+    return "1k+"
+
+class Profiler:
+    # Times the systems of a turn. Each keeps its latest times, for percentiles of
+    # how long it takes lately, and the total of all of them. Timing is a
+    # time.perf_counter() call on either side, cheap enough to leave on.
+    def __init__(self, window=PROFILE_WINDOW):
+        self.samples = {system: deque(maxlen=window) for system in SYSTEMS}
+        self.totals = {system: 0 for system in SYSTEMS}
+        self.counts = {system: 0 for system in SYSTEMS}
+
+    def add(self, system, start):
+        # start is the time.perf_counter() the system started at
+        seconds = time.perf_counter() - start
+        self.samples[system].append(seconds)
+        self.totals[system] += seconds
+        self.counts[system] += 1
+
+    def get_percentiles(self, system):
+        # the PERCENTILES of the latest times, or None if it hasn't run yet
+        samples = sorted(self.samples[system])
+        if not samples:
+            return None
+        return [samples[min(len(samples) - 1, len(samples) * percentile // 100)]
+                for percentile in PERCENTILES]
+
+    def get_report(self):
+        lines = ["{0:<8}{1:>8}{2:>10}{3}{4:>9}".format(
+            "system", "count", "total s",
+            "".join("{0:>9}".format("p{0} ms".format(percentile)) for percentile in PERCENTILES),
+            "max ms")]
+        for system in SYSTEMS:
+            percentiles = self.get_percentiles(system)
+            if percentiles is None:
+                continue
+            lines.append("{0:<8}{1:>8}{2:>10.3f}{3}{4:>9.2f}".format(
+                system, self.counts[system], self.totals[system],
+                "".join("{0:>9.2f}".format(seconds * 1000) for seconds in percentiles),
+                max(self.samples[system]) * 1000))
+        return lines
+
+    def dump(self, filename):
+        with open(filename, "w") as profile_file:
+            profile_file.write("\n".join(self.get_report()) + "\n")
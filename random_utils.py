@@ -1,4 +1,46 @@
-from random import randint
+from contextlib import contextmanager
+from random import Random, getrandbits
+
+# The game draws its random numbers from these named streams rather than from
+# the random module. Each is seeded from the run seed, the turn and its own name,
+# so a stream that draws more or less often doesn't change what the others draw,
+# and a save only needs the run seed and the turn to carry on exactly as it would have.
+mapgen_random = Random()
+combat_random = Random()
+ai_random = Random()
+loot_random = Random()
+plot_random = Random()
+identity_random = Random()
+misc_random = Random()
+
+RANDOM_STREAMS = {
+    "mapgen": mapgen_random,
+    "combat": combat_random,
+    "ai": ai_random,
+    "loot": loot_random,
+    "plot": plot_random,
+    "identity": identity_random,
+    "misc": misc_random
+}
+
+def get_run_seed():
+    return getrandbits(32)
+
+def seed_streams(run_seed, turn=0):
+    for name, stream in RANDOM_STREAMS.items():
+        stream.seed("{0}:{1}:{2}".format(run_seed, turn, name))
+
+@contextmanager
+def seeded_streams(seed):
+    # What is drawn inside the with block depends on seed alone, and the streams
+    # carry on afterwards as if it had never been drawn.
+    states = {name: stream.getstate() for name, stream in RANDOM_STREAMS.items()}
+    seed_streams(seed)
+    try:
+        yield
+    finally:
+        for name, stream in RANDOM_STREAMS.items():
+            stream.setstate(states[name])
 
 def from_dungeon_level(table, dungeon_level):
     for (value, level) in reversed(table):
@@ -7,7 +49,7 @@ def from_dungeon_level(table, dungeon_level):
     return 0
 
 def random_choice_index(chances):
-    random_chance = randint(1, sum(chances))
+    random_chance = mapgen_random.randint(1, sum(chances))
 
     running_sum = 0
     choice = 0
@@ -22,3 +64,6 @@ def random_choice_from_dict(choice_dict):
     chances = list(choice_dict.values())
 
     return choices[random_choice_index(chances)]
+
+# draws made while the game loads, before any run is seeded, are the same every time
+seed_streams(0)
@@ -1,11 +1,15 @@
+import heapq
+import numpy as np
 import tcod as libtcod
 from enum import Enum
+from frame_clock import FrameClock
 from game_states import GameStates
-from math import sqrt
-from menus import inventory_menu, level_up_menu, character_screen, help_screen, format_weight, confirmation_menu
+from menus import inventory_menu, level_up_menu, character_screen, help_screen, message_log_screen, format_weight, confirmation_menu
 from plot_gen import get_name
+from profiler import PERCENTILES, SYSTEMS, format_milliseconds
 from rpg_mechanics import display_ability
 import textwrap
+import time
 
 class RenderOrder(Enum):
     TRAP = 1
@@ -17,6 +21,20 @@ class RenderOrder(Enum):
     ITEM = 7
     ACTOR = 8
 
+# the most entities that fit in the status panel's list of what's in view
+MAX_STATUS_ENTITIES = 12
+
+def get_entities_in_render_order(entities):
+    # EntityLists keep their entities bucketed by render order, other lists are sorted
+    if hasattr(entities, "in_render_order"):
+        return entities.in_render_order()
+    return sorted(entities, key=lambda x: x.render_order.value)
+
+def get_monsters(entities):
+    if hasattr(entities, "with_component"):
+        return entities.with_component("ai")
+    return [entity for entity in entities if entity.ai]
+
 def get_names_under_mouse(mouse, entities, fov_map):
     (x, y) = (mouse.cx, mouse.cy)
 
@@ -57,11 +75,41 @@ def get_health_color(hp_ratio):
 
     return [r_value, g_value, 0]
     
-def render_status_panel(panel, x, y, width, height, player, game_state, entities, game_map, fov_map, turn, color_accessibility, cursor):
-    for tmp_x in range(width):
-        for tmp_y in range(height):
-            libtcod.console_put_char(panel, x + tmp_x, y + tmp_y, ' ', libtcod.BKGND_NONE)
-            
+class StatusPanel:
+    # The status panel's offscreen console, only redrawn when something it shows
+    # changes: HP, the turn, hunger, the monsters in view or the look-at cursor.
+    # Otherwise the console drawn on an earlier frame is blitted again.
+    def __init__(self, console, width, height):
+        self.console = console
+        self.width = width
+        self.height = height
+        self.shown = None
+
+    def render(self, player, game_state, entities, game_map, fov_map, turn, color_accessibility, cursor):
+        see_invisible = player.fighter.is_effect("see_invisible")
+        entities_in_fov = entity_in_fov_list(entities, game_map, fov_map, see_invisible)
+        # only the nearest ones fit, so there is no need to sort all of them
+        entities_in_fov = heapq.nsmallest(MAX_STATUS_ENTITIES, entities_in_fov,
+                                          key=lambda e: (player.x - e.x) ** 2 + (player.y - e.y) ** 2)
+
+        shown = (player.name, player.fighter.hp, player.fighter.max_hp, game_map.dungeon_level, turn,
+                 player.hunger.status, color_accessibility,
+                 (cursor.x, cursor.y) if game_state == GameStates.LOOK_AT else None,
+                 [(e.get_char, e.get_color, e.get_name, e.fighter.hp, e.fighter.max_hp,
+                   e.ai.__class__.__name__) for e in entities_in_fov])
+
+        if shown != self.shown:
+            libtcod.console_set_default_background(self.console, libtcod.black)
+            libtcod.console_clear(self.console)
+            render_status_panel(self.console, 0, 0, self.width, self.height, player, game_state,
+                                entities_in_fov, game_map, turn, color_accessibility, cursor)
+            self.shown = shown
+
+    def blit(self, con, x, y):
+        self.console.blit(con, x, y, 0, 0, self.width, self.height)
+
+def render_status_panel(panel, x, y, width, height, player, game_state, entities_in_fov, game_map, turn, color_accessibility, cursor):
+    # entities_in_fov are the monsters to list, nearest first; the panel is expected to be cleared
     libtcod.console_set_default_background(panel, libtcod.darkest_grey)
     libtcod.console_rect(panel, x, y, width, height, False, libtcod.BKGND_SET)
 
@@ -84,10 +132,6 @@ def render_status_panel(panel, x, y, width, height, player, game_state, entities
         libtcod.console_print_ex(panel, x + 1, height - 5, libtcod.BKGND_NONE, libtcod.LEFT,
                                  '({0}, {1})'.format(cursor.x, cursor.y))
 
-    see_invisible = player.fighter.is_effect("see_invisible")
-    entities_in_fov = entity_in_fov_list(entities, game_map, fov_map, see_invisible)
-    entities_in_fov.sort(key = lambda e: sqrt((player.x - e.x) ** 2 + (player.y - e.y) ** 2))
-    
     index = 0
     for e in entities_in_fov:
         # Entity char
@@ -122,17 +166,13 @@ def render_status_panel(panel, x, y, width, height, player, game_state, entities
                                      "(neutral)")
         index += 3
 
-        # max number of entities who can comfortably fit on screen
-        if index >= 3 * 12:
-            break
-
     libtcod.console_set_default_background(panel, libtcod.black)
 
 def entity_in_fov_list(entities, game_map, fov_map, see_invisible):
     entities_in_fov = []
     
-    for entity in entities:
-        if fov_map.fov[entity.y][entity.x] and game_map.tiles[entity.x][entity.y].explored:
+    for entity in get_monsters(entities):
+        if fov_map.fov[entity.y][entity.x] and game_map.explored[entity.x, entity.y]:
             if entity.fighter and entity.ai:
                 if entity.fighter.effects.get("invisible") and entity.fighter.effects.get("invisible").turns_remaining <= 0:
                     entities_in_fov.append(entity)
@@ -141,102 +181,179 @@ def entity_in_fov_list(entities, game_map, fov_map, see_invisible):
     # can't get always_visible status
     return entities_in_fov
 
-def render_tile(con, game_state, game_map, fov_map, cursor, x, y, colors, config):
-    visible = fov_map.fov[y][x]
-    wall = game_map.tiles[x][y].block_sight
-    window = game_map.tiles[x][y].window
-
-    if config.get("CLASSIC_COLOR"):
-        if visible:
-            if wall:
-                libtcod.console_set_default_foreground(con, colors.get('classic_light_wall'))
-                libtcod.console_put_char(con, x, y, '#', libtcod.BKGND_NONE)
-            elif window:
-                libtcod.console_set_default_foreground(con, colors.get('classic_light_window'))
-                libtcod.console_put_char(con, x, y, '#', libtcod.BKGND_NONE)
-            else:
-                libtcod.console_set_default_foreground(con, colors.get('classic_light_ground'))
-                libtcod.console_put_char(con, x, y, '.', libtcod.BKGND_NONE)
-            game_map.tiles[x][y].explored = True
-        elif game_map.tiles[x][y].explored:
-            if wall:
-                libtcod.console_set_default_foreground(con, colors.get('classic_dark_wall'))
-                libtcod.console_put_char(con, x, y, '#', libtcod.BKGND_NONE)
-            if window:
-                libtcod.console_set_default_foreground(con, colors.get('classic_dark_window'))
-                libtcod.console_put_char(con, x, y, '#', libtcod.BKGND_NONE)
-            else:
-                libtcod.console_set_default_foreground(con, colors.get('classic_dark_ground'))
-                libtcod.console_put_char(con, x, y, ' ', libtcod.BKGND_NONE)
+def select_colors(conditions, colors, default):
+    # np.select over (height, width) masks, picking an RGB color for each cell
+    return np.select([condition[..., np.newaxis] for condition in conditions],
+                     [np.array(color, dtype=np.uint8) for color in colors],
+                     np.array(default, dtype=np.uint8)).astype(np.uint8)
+
+def get_tile_arrays(game_map, fov_map, colors, config):
+    # The ch, fg and bg of every map tile, indexed [y, x] like the console arrays.
+    # Tiles that are neither visible nor explored are blank.
+    visible = fov_map.fov
+    explored = game_map.explored.T
+    wall = game_map.block_sight.T
+    window = game_map.window.T
+    lit = visible
+    dark = ~visible & explored
+
+    ch = np.full(visible.shape, ord(' '), dtype=np.int32)
+    fg = np.full(visible.shape + (3,), 255, dtype=np.uint8)
+    bg = np.zeros(visible.shape + (3,), dtype=np.uint8)
+
+    if config.get("DEBUG_SHOW_FOV"):
+        bg = select_colors([lit & wall, lit & window, lit],
+                           [libtcod.sepia, libtcod.darker_grey, libtcod.white], libtcod.black)
+    elif config.get("CLASSIC_COLOR"):
+        ch = np.select([lit & (wall | window), lit, dark & (wall | window)],
+                       [ord('#'), ord('.'), ord('#')], ord(' ')).astype(np.int32)
+        fg = select_colors([lit & wall, lit & window, lit, dark & wall, dark & window, dark],
+                           [colors.get('classic_light_wall'), colors.get('classic_light_window'),
+                            colors.get('classic_light_ground'), colors.get('classic_dark_wall'),
+                            colors.get('classic_dark_window'), colors.get('classic_dark_ground')],
+                           libtcod.white)
     else:
-        if visible:
-            if wall:
-                libtcod.console_set_char_background(con, x, y, colors.get('light_wall'), libtcod.BKGND_SET)
-            elif window:
-                libtcod.console_set_char_background(con, x, y, colors.get('light_window'), libtcod.BKGND_SET)
-            else:
-                libtcod.console_set_char_background(con, x, y, colors.get('light_ground'), libtcod.BKGND_SET)
-            game_map.tiles[x][y].explored = True
-        elif game_map.tiles[x][y].explored:
-            if wall:
-                libtcod.console_set_char_background(con, x, y, colors.get('dark_wall'), libtcod.BKGND_SET)
-            elif window:
-                libtcod.console_set_char_background(con, x, y, colors.get('dark_window'), libtcod.BKGND_SET)
-            else:
-                libtcod.console_set_char_background(con, x, y, colors.get('dark_ground'), libtcod.BKGND_SET)
-
-def render_tile_in_fov(con, game_state, game_map, fov_map, x, y):
-    visible = fov_map.fov[y][x]
-    wall = game_map.tiles[x][y].block_sight
-    window = game_map.tiles[x][y].window
-
-    if visible:
-        if wall:
-            libtcod.console_set_char_background(con, x, y, libtcod.sepia, libtcod.BKGND_SET)
-        elif window:
-            libtcod.console_set_char_background(con, x, y, libtcod.darker_grey, libtcod.BKGND_SET)
-        else:
-            libtcod.console_set_char_background(con, x, y, libtcod.white, libtcod.BKGND_SET)
+        bg = select_colors([lit & wall, lit & window, lit, dark & wall, dark & window, dark],
+                           [colors.get('light_wall'), colors.get('light_window'),
+                            colors.get('light_ground'), colors.get('dark_wall'),
+                            colors.get('dark_window'), colors.get('dark_ground')],
+                           libtcod.black)
+
+    return ch, fg, bg
+
+def paint_tiles(con, game_map, fov_map, colors, config, dirty=None):
+    # writes the tiles into the console buffers, only where dirty ([y, x]) is set if given
+    ch, fg, bg = get_tile_arrays(game_map, fov_map, colors, config)
+    view = (slice(0, game_map.height), slice(0, game_map.width))
+
+    if dirty is None:
+        con.ch[view] = ch
+        con.fg[view] = fg
+        con.bg[view] = bg
     else:
-        libtcod.console_set_char_background(con, x, y, libtcod.black, libtcod.BKGND_SET)
+        con.ch[view][dirty] = ch[dirty]
+        con.fg[view][dirty] = fg[dirty]
+        con.bg[view][dirty] = bg[dirty]
+
+class MapRenderer:
+    # Remembers what was last painted on the map console, so that each frame only
+    # repaints the tiles whose FOV, explored or wall state changed, and the cells
+    # where an entity glyph appeared, changed or went away. Tiles are written
+    # straight into the console buffers, see paint_tiles.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.invalidate()
+
+    def invalidate(self):
+        # the console was cleared or drawn over, repaint everything on the next frame
+        self.tiles = None
+        self.glyphs = {}
+        self.classic_color = None
+        # the animations drawn in the last frame and its time, see get_animation_delay
+        self.animations = []
+        self.frame_time = 0
+
+    def get_dirty_tiles(self, game_map, fov_map, fov_recompute, config):
+        # a [y, x] mask of the tiles to repaint, or None to repaint all of them
+        visible = fov_map.fov
+        game_map.explored |= visible.T
+        tiles = (visible.copy(), game_map.explored.T.copy(), game_map.block_sight.T.copy(),
+                 game_map.window.T.copy())
+
+        if self.tiles is None or self.classic_color != config.get("CLASSIC_COLOR"):
+            dirty = None
+        else:
+            dirty = np.zeros((self.height, self.width), dtype=bool)
+            if fov_recompute:
+                for old, new in zip(self.tiles, tiles):
+                    dirty |= old != new
+
+        self.tiles = tiles
+        self.classic_color = config.get("CLASSIC_COLOR")
+        return dirty
+
+    def get_glyphs(self, entities, player, game_map, fov_map, game_state, cursor, frame_time):
+        see_ai = player.fighter.is_effect("detect_aura")
+        see_items = player.fighter.is_effect("detect_items")
+        see_invisible = player.fighter.is_effect("see_invisible")
+
+        # entities later in the render order are drawn on top
+        glyphs = {}
+        self.animations = []
+        for entity in get_entities_in_render_order(entities):
+            if entity.animation:
+                entity.animation.tick(frame_time)
+            glyph = get_entity_glyph(entity, fov_map, game_map, see_ai, see_items, see_invisible)
+            if glyph:
+                glyphs[(entity.x, entity.y)] = glyph
+                if entity.animation:
+                    self.animations.append(entity.animation)
+
+        if game_state == GameStates.LOOK_AT:
+            cursor.animation.tick(frame_time)
+            glyphs[(cursor.x, cursor.y)] = (cursor.animation.get_char, libtcod.white)
+            self.animations.append(cursor.animation)
+
+        return glyphs
+
+    def render(self, con, entities, player, game_map, fov_map, fov_recompute, colors,
+               game_state, cursor, config, frame_time):
+        if self.tiles is None:
+            libtcod.console_clear(con)
+
+        dirty = self.get_dirty_tiles(game_map, fov_map, fov_recompute, config)
+        glyphs = self.get_glyphs(entities, player, game_map, fov_map, game_state, cursor, frame_time)
+
+        if dirty is not None:
+            # cells an entity went away from get their tile back
+            for (x, y) in self.glyphs:
+                if (x, y) not in glyphs:
+                    dirty[y, x] = True
+
+        paint_tiles(con, game_map, fov_map, colors, config, dirty)
+
+        for (x, y), glyph in glyphs.items():
+            if dirty is None or dirty[y, x] or self.glyphs.get((x, y)) != glyph:
+                char, color = glyph
+                libtcod.console_set_default_foreground(con, color)
+                libtcod.console_put_char(con, x, y, char, libtcod.BKGND_NONE)
+
+        self.glyphs = glyphs
+        self.frame_time = frame_time
+
+    def get_animation_delay(self):
+        # seconds until an animation on screen shows its next frame, or None
+        if not self.animations:
+            return None
+        return min(animation.time_to_next_frame(self.frame_time) for animation in self.animations)
+
+    def render_fov_debug(self, con, entities, game_map, fov_map):
+        libtcod.console_clear(con)
+        paint_tiles(con, game_map, fov_map, None, {"DEBUG_SHOW_FOV": True})
+
+        for entity in get_entities_in_render_order(entities):
+            draw_entity_in_fov(con, entity, fov_map)
 
-def render_all(con, panel, status_screen, entities, player, game_map, fov_map, fov_recompute,
+        # the normal map view is repainted from scratch once the debug view is closed
+        self.invalidate()
+
+def render_all(con, panel, status_panel, map_renderer, entities, player, game_map, fov_map, fov_recompute,
                turn, message_log, screen_width, screen_height, panel_height, panel_y,
                mouse, colors, game_state, cursor, config, status_screen_width, status_screen_height,
-               identities):
-
-    if config.get("DEBUG_SHOW_FOV"):
-        for y in range(game_map.height):
-            for x in range(game_map.width):
-                render_tile_in_fov(con, game_state, game_map, fov_map, x, y)
-    elif fov_recompute:
-        for y in range(game_map.height):
-            for x in range(game_map.width):
-                render_tile(con, game_state, game_map, fov_map, False, x, y, colors, config)
-                
-    # ENTITIES
-    entities_in_render_order = sorted(entities, key=lambda x: x.render_order.value)
-
-    see_ai = player.fighter.is_effect("detect_aura")
-    see_items = player.fighter.is_effect("detect_items")
-    see_invisible = player.fighter.is_effect("see_invisible")
+               identities, frame_time):
 
     if config.get("DEBUG_SHOW_FOV"):
-        for entity in entities_in_render_order:
-            draw_entity_in_fov(con, entity, fov_map)
+        map_renderer.render_fov_debug(con, entities, game_map, fov_map)
     else:
-        for entity in entities_in_render_order:
-            if entity.animation:
-                draw_animated_entity(con, entity, fov_map, game_map, identities, see_ai, see_items, see_invisible)
-            else:
-                draw_entity(con, entity, fov_map, game_map, identities, see_ai, see_items, see_invisible)
+        map_renderer.render(con, entities, player, game_map, fov_map, fov_recompute, colors,
+                            game_state, cursor, config, frame_time)
+
+    ### STATUS PANEL ###
+    # drawn into con before con goes to the screen, so it shows this frame's state
+    status_panel.render(player, game_state, entities, game_map, fov_map, turn, False, cursor)
+    status_panel.blit(con, screen_width - status_screen_width, 0)
 
-    # CURSOR
-    if game_state == GameStates.LOOK_AT:
-        cursor.animation.tick()
-        libtcod.console_set_default_foreground(con, libtcod.white)
-        libtcod.console_put_char(con, cursor.x, cursor.y, cursor.animation.get_char, libtcod.BKGND_NONE)
-            
     libtcod.console_blit(con, 0, 0, screen_width, screen_height, 0, 0, 0)
     
     libtcod.console_set_default_background(panel, libtcod.black)
@@ -244,9 +361,9 @@ def render_all(con, panel, status_screen, entities, player, game_map, fov_map, f
 
     # MESSAGE LOG
     y = 1
-    for message in message_log.messages:
-        libtcod.console_set_default_foreground(panel, message.color)
-        libtcod.console_print_ex(panel, message_log.x, y, libtcod.BKGND_NONE, libtcod.LEFT, message.text)
+    for (text, color) in message_log.get_lines(message_log.width, message_log.height):
+        libtcod.console_set_default_foreground(panel, color)
+        libtcod.console_print_ex(panel, message_log.x, y, libtcod.BKGND_NONE, libtcod.LEFT, text)
         y += 1
 
     #### DO I STILL WANT TO KEEP THIS FUNCTIONALITY? ###
@@ -258,13 +375,6 @@ def render_all(con, panel, status_screen, entities, player, game_map, fov_map, f
 
     libtcod.console_blit(panel, 0, 0, screen_width, panel_height, 0, 0, panel_y)
 
-    ### STATUS PANEL ###
-    libtcod.console_set_default_background(status_screen, libtcod.black)
-    libtcod.console_clear(status_screen)
-    render_status_panel(status_screen, 0, 0, status_screen_width, status_screen_height, player, game_state, entities, game_map, fov_map, turn, False, cursor)
-    # THIS IS BUGGY AF, LIBTCOD IS SKETCHY
-    status_screen.blit(con, screen_width - status_screen_width, 0, 0, 0, status_screen_width, status_screen_height)
-    
     # MENUS
     if game_state in (GameStates.SHOW_INVENTORY, GameStates.DROP_INVENTORY,
                       GameStates.IDENTIFY_INVENTORY, GameStates.CHARGE_INVENTORY,
@@ -287,6 +397,85 @@ def render_all(con, panel, status_screen, entities, player, game_map, fov_map, f
         character_screen(player, 30, game_map.width, game_map.height)
     elif game_state == GameStates.HELP_SCREEN:
         help_screen(45, screen_width, screen_height)
+    elif game_state == GameStates.MESSAGE_LOG:
+        message_log_screen(message_log, screen_width, screen_height)
+
+class GameRenderer:
+    # Draws a GameEngine. It is one of the engine's observers, so it hears about the
+    # steps that change the whole map, and its FrameClock paces the drawing.
+    def __init__(self, con, panel, status_screen, constants):
+        self.con = con
+        self.panel = panel
+        self.constants = constants
+        self.map_renderer = MapRenderer(constants['map_width'], constants['map_height'])
+        self.status_panel = StatusPanel(status_screen, constants['status_screen_width'], constants['status_screen_height'])
+        self.frame_clock = FrameClock(constants['frame_cap'])
+        self.show_profiler = False
+
+    def toggle_profiler(self):
+        self.show_profiler = not self.show_profiler
+        self.frame_clock.mark_dirty()
+
+    def notify(self, engine, results):
+        if results:
+            self.frame_clock.mark_dirty()
+        for result in results:
+            if result.get("new_floor") or result.get("redraw_map"):
+                self.map_renderer.invalidate()
+
+    def render(self, engine, mouse):
+        # draws a frame if one is due, and returns whether it did; flushing the
+        # console is left to the caller, who may want to draw over it
+        if not self.frame_clock.frame_due():
+            return False
+
+        constants = self.constants
+        if engine.game_state == GameStates.CHARACTER_CREATION:
+            render_character_creation(self.con, self.panel, constants['screen_width'],
+                                      constants['screen_height'], engine.creation_menu_cursor,
+                                      engine.game.stat_diffs, engine.game.points_available,
+                                      engine.stat_boosts, engine.plot)
+            self.frame_clock.frame_drawn()
+        else:
+            start = time.perf_counter()
+            render_all(self.con, self.panel, self.status_panel, self.map_renderer, engine.entities,
+                       engine.player, engine.game_map, engine.fov_map, engine.fov_recompute,
+                       engine.turn, engine.message_log,
+                       constants['screen_width'], constants['screen_height'],
+                       constants['panel_height'], constants['panel_y'], mouse,
+                       constants['colors'], engine.game_state, engine.key_cursor,
+                       {"CLASSIC_COLOR": False, "DEBUG_SHOW_FOV": engine.debug_show_fov},
+                       constants["status_screen_width"], constants["status_screen_height"],
+                       engine.identities, self.frame_clock.frame_time)
+            engine.profiler.add("render", start)
+            if self.show_profiler:
+                render_profiler(0, constants['screen_width'] - constants['status_screen_width'],
+                                constants['status_screen_width'], constants['status_screen_height'],
+                                engine.profiler)
+            engine.fov_recompute = False
+            self.frame_clock.frame_drawn(self.map_renderer.get_animation_delay())
+        return True
+
+def render_profiler(con, x, width, height, profiler):
+    # the latest percentiles of each system in milliseconds, over the bottom of the
+    # status panel, above the turn and dungeon level
+    y = height - 6 - len(SYSTEMS)
+    libtcod.console_set_default_background(con, libtcod.black)
+    libtcod.console_rect(con, x, y, width, len(SYSTEMS) + 1, True, libtcod.BKGND_SET)
+
+    libtcod.console_set_default_foreground(con, libtcod.light_grey)
+    libtcod.console_print_ex(con, x + 1, y, libtcod.BKGND_NONE, libtcod.LEFT,
+                             "{0:<7}{1}".format("ms", "".join("{0:>4}".format("p{0}".format(p)) for p in PERCENTILES)))
+
+    libtcod.console_set_default_foreground(con, libtcod.white)
+    for i, system in enumerate(SYSTEMS):
+        percentiles = profiler.get_percentiles(system)
+        if percentiles is None:
+            times = "".join("{0:>4}".format("-") for p in PERCENTILES)
+        else:
+            times = "".join("{0:>4}".format(format_milliseconds(seconds)) for seconds in percentiles)
+        libtcod.console_print_ex(con, x + 1, y + 1 + i, libtcod.BKGND_NONE, libtcod.LEFT,
+                                 "{0:<7}{1}".format(system, times))
 
 creation_menu = {
         "Ability scores": ["Strength", "Dexterity", "Constitution", "Intelligence", "Wisdom", "Charisma"],
@@ -371,45 +560,25 @@ def draw_background_rect(con, x, y, w, h, color):
         for k in range(h):
             libtcod.console_set_char_background(con, x + i, y + k, color, libtcod.BKGND_SET)
     
-def clear_all(con, entities, cursor):
-    for entity in entities:
-        clear_entity(con, entity)
-    clear_entity(con, cursor)
-
-def draw_entity(con, entity, fov_map, game_map, identities, see_ai, see_items, see_invisible):
-    if fov_map.fov[entity.y][entity.x] or ((entity.stairs or entity.door or entity.sign) and game_map.tiles[entity.x][entity.y].explored) or (entity.trap and entity.trap.revealed):
-        libtcod.console_set_default_foreground(con, entity.get_color)
-        if entity.fighter and entity.ai:
-            if not entity.fighter.is_effect("invisible") or see_invisible:
-                libtcod.console_put_char(con, entity.x, entity.y, entity.get_char, libtcod.BKGND_NONE)
-        else:
-            libtcod.console_put_char(con, entity.x, entity.y, entity.get_char, libtcod.BKGND_NONE)
-    elif see_ai and entity.ai:
-        libtcod.console_set_default_foreground(con, entity.get_color)
-        libtcod.console_put_char(con, entity.x, entity.y, entity.get_char, libtcod.BKGND_NONE)
-    elif see_items and entity.item:
-        libtcod.console_set_default_foreground(con, entity.get_color)
-        libtcod.console_put_char(con, entity.x, entity.y, entity.get_char, libtcod.BKGND_NONE)
+def get_entity_glyph(entity, fov_map, game_map, see_ai, see_items, see_invisible):
+    # the (char, color) the entity is drawn with this frame, or None if it isn't drawn
+    if entity.animation:
+        char, color = entity.animation.get_char, entity.animation.get_color
+    else:
+        char, color = entity.get_char, entity.get_color
 
-def draw_animated_entity(con, entity, fov_map, game_map, identities, see_ai, see_items, see_invisible):
-    if fov_map.fov[entity.y][entity.x] or ((entity.stairs or entity.door or entity.sign) and game_map.tiles[entity.x][entity.y].explored) or (entity.trap and entity.trap.revealed):
-        libtcod.console_set_default_foreground(con, entity.animation.get_color)
+    if fov_map.fov[entity.y][entity.x] or ((entity.stairs or entity.door or entity.sign) and game_map.explored[entity.x, entity.y]) or (entity.trap and entity.trap.revealed):
         if entity.fighter and entity.ai:
             if not entity.fighter.is_effect("invisible") or see_invisible:
-                libtcod.console_put_char(con, entity.x, entity.y, entity.animation.get_char, libtcod.BKGND_NONE)
+                return (char, color)
         else:
-            libtcod.console_put_char(con, entity.x, entity.y, entity.animation.get_char, libtcod.BKGND_NONE)
+            return (char, color)
     elif see_ai and entity.ai:
-        libtcod.console_set_default_foreground(con, entity.animation.get_color)
-        libtcod.console_put_char(con, entity.x, entity.y, entity.animation.get_char, libtcod.BKGND_NONE)
+        return (char, color)
     elif see_items and entity.item:
-        libtcod.console_set_default_foreground(con, entity.animation.get_color)
-        libtcod.console_put_char(con, entity.x, entity.y, entity.animation.get_char, libtcod.BKGND_NONE)
-        
-    entity.animation.tick()
+        return (char, color)
 
-def clear_entity(con, entity):
-    libtcod.console_put_char(con, entity.x, entity.y, ' ', libtcod.BKGND_NONE)
+    return None
 
 def draw_entity_in_fov(con, entity, fov_map):
     if fov_map.fov[entity.y][entity.x]:
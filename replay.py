@@ -0,0 +1,108 @@
+#!/usr/bin/python3 -Wignore
+import argparse
+import sys
+import tempfile
+import time
+import tcod as libtcod
+from game_engine import GameEngine
+from loader_functions.initialize_new_game import get_constants
+from loader_functions.session_log import read_session, start_session
+from render_functions import GameRenderer
+
+# Plays a session log from the sessions directory back through the game at full
+# speed, and reports how long it took and which turns were the slowest. Run it
+# from the game's directory, with --render to watch it in a window:
+#     python3 replay.py sessions/session_2020_01_01_12_00_00.log --slowest 10
+
+class ReplayViewer:
+    # An observer that draws the replay as it goes, as often as the frame cap allows.
+    def __init__(self, con, panel, status_screen, constants):
+        self.renderer = GameRenderer(con, panel, status_screen, constants)
+        self.key = libtcod.Key()
+        self.mouse = libtcod.Mouse()
+
+    def notify(self, engine, results):
+        self.renderer.notify(engine, results)
+        libtcod.sys_check_for_event(libtcod.EVENT_KEY_PRESS | libtcod.EVENT_MOUSE, self.key, self.mouse)
+        if libtcod.console_is_window_closed():
+            sys.exit()
+
+        if self.renderer.render(engine, self.mouse):
+            start = time.perf_counter()
+            libtcod.console_flush()
+            engine.profiler.add("flush", start)
+
+def timed_step(engine, action, turn_times):
+    turn = engine.turn
+    start = time.perf_counter()
+    engine.step(action)
+    turn_times[turn] = turn_times.get(turn, 0) + time.perf_counter() - start
+
+def replay_session(filename, constants, observer=None):
+    # Returns the engine as the session left it and the seconds each turn took.
+    # The log only has the actions the player took, so the turns the game plays
+    # by itself in between, like monster turns and resting, are played here.
+    header, records = read_session(filename)
+    turn_times = {}
+
+    with tempfile.TemporaryDirectory() as floors_directory:
+        game_variables, game = start_session(header, floors_directory)
+        player, entities, game_map, message_log, game_state, turn, identities = game_variables
+        engine = GameEngine(player, entities, game_map, turn, message_log, game_state,
+                            constants, game, identities)
+        if observer:
+            engine.observers.append(observer)
+
+        for (turn, action) in records:
+            while engine.busy:
+                timed_step(engine, {}, turn_times)
+            if engine.turn != turn:
+                raise ValueError("The replay went out of step with the session on turn {0}, "
+                                 "where the session was on turn {1}".format(engine.turn, turn))
+            timed_step(engine, action, turn_times)
+
+        while engine.busy:
+            timed_step(engine, {}, turn_times)
+
+    return engine, turn_times
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session at full speed.")
+    parser.add_argument("session", help="a session log from the sessions directory")
+    parser.add_argument("--render", action="store_true", help="draw the replay in a window")
+    parser.add_argument("--slowest", type=int, default=5, help="how many of the slowest turns to list")
+    args = parser.parse_args()
+
+    constants = get_constants()
+    observer = None
+    if args.render:
+        libtcod.console_set_custom_font('assets/cp437_10x10.png',
+                                        libtcod.FONT_TYPE_GREYSCALE | libtcod.FONT_LAYOUT_ASCII_INROW)
+        libtcod.console_init_root(constants['screen_width'], constants['screen_height'],
+                                  constants['window_title'], False, libtcod.RENDERER_OPENGL2)
+        observer = ReplayViewer(libtcod.console_new(constants['screen_width'], constants['screen_height']),
+                                libtcod.console_new(constants['message_width'], constants['panel_height']),
+                                libtcod.console_new(constants['status_screen_width'], constants['status_screen_height']),
+                                constants)
+
+    start = time.perf_counter()
+    try:
+        engine, turn_times = replay_session(args.session, constants, observer)
+    except ValueError as e:
+        print(e)
+        return
+    seconds = time.perf_counter() - start
+
+    print("turns: {0}".format(len(turn_times)))
+    print("seconds: {0:.3f}".format(seconds))
+    if seconds > 0:
+        print("turns_per_second: {0:.1f}".format(len(turn_times) / seconds))
+    for line in engine.profiler.get_report():
+        print(line)
+
+    print("slowest turns:")
+    for turn, turn_seconds in sorted(turn_times.items(), key=lambda turn_time: -turn_time[1])[:args.slowest]:
+        print("  turn {0}: {1:.2f} ms".format(turn, turn_seconds * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from random import randint
+from random_utils import combat_random
 
 def get_modifier(score):
     return (score // 2) - 5
@@ -13,7 +13,7 @@ def die(count, side_count):
     if side_count >= 1 and count >= 1:
         total = 0
         for i in range(count):
-            total += randint(1, side_count)
+            total += combat_random.randint(1, side_count)
         return total
     else:
         return 0
@@ -0,0 +1,97 @@
+import heapq
+
+# One game turn, in scheduler time. An entity with speed NORMAL_SPEED acts once
+# per turn, one with twice the speed acts twice.
+TURN_LENGTH = 100
+NORMAL_SPEED = 100
+
+class TurnScheduler:
+    # The entities with an ai, queued by the time of their next action. Each enemy
+    # turn only pops the entities that are due, so monsters that are stunned or
+    # otherwise idle sleep in the queue until they wake up instead of being
+    # polled every turn.
+    def __init__(self):
+        self.time = 0
+        self.queue = []
+        self.next_action = {}
+        # entity: (idle ai, time it went idle), see skip_idle_turns
+        self.idle = {}
+        # the idle entities that were put to sleep far from the player, used as an
+        # ordered set, see make_dormant
+        self.dormant = {}
+        # ties are broken by insertion, so entities act in the order they were queued
+        self.counter = 0
+
+    def schedule(self, entity, time):
+        self.next_action[entity] = time
+        self.counter += 1
+        heapq.heappush(self.queue, (time, self.counter, entity))
+
+    def add(self, entity):
+        if entity not in self.next_action:
+            self.schedule(entity, self.time)
+
+    def remove(self, entity):
+        # stale queue entries are skipped when they are popped
+        self.next_action.pop(entity, None)
+        self.idle.pop(entity, None)
+        self.dormant.pop(entity, None)
+
+    def wake(self, entity):
+        # the entity's ai was swapped, or the player came near a dormant entity,
+        # so whatever it was idling on no longer holds
+        self.dormant.pop(entity, None)
+        if entity in self.idle and self.next_action.get(entity, self.time) > self.time:
+            self.schedule(entity, self.time)
+
+    def action_cost(self, entity):
+        return TURN_LENGTH * NORMAL_SPEED // getattr(entity, "speed", NORMAL_SPEED)
+
+    def pop_due(self):
+        # the next entity due to act this turn, or None when the turn is over
+        end = self.time + TURN_LENGTH
+        while self.queue and self.queue[0][0] < end:
+            time, _, entity = heapq.heappop(self.queue)
+            if self.next_action.get(entity) != time:
+                continue
+
+            del self.next_action[entity]
+            self.skip_idle_turns(entity, time)
+            # entities that act again this turn are queued behind the ones that haven't
+            self.schedule(entity, time + self.action_cost(entity))
+            return entity
+
+        return None
+
+    def end_turn(self):
+        self.time += TURN_LENGTH
+
+    def skip_idle_turns(self, entity, time):
+        self.dormant.pop(entity, None)
+        idle_ai, since = self.idle.pop(entity, (None, None))
+        if idle_ai is not None:
+            idle_ai.skip_turns(max(0, time - since) // self.action_cost(entity))
+
+    def acted(self, entity):
+        # AIs that know they will do nothing for a while say so with get_idle_turns,
+        # and are told how many of those turns went by with skip_turns when they wake
+        idle_turns = 0
+        if entity.ai and hasattr(entity.ai, "get_idle_turns"):
+            idle_turns = entity.ai.get_idle_turns()
+
+        if idle_turns > 0 and entity in self.next_action:
+            since = self.next_action[entity]
+            self.idle[entity] = (entity.ai, since)
+            self.schedule(entity, since + idle_turns * self.action_cost(entity))
+
+    def make_dormant(self, entity, turns):
+        # Entities far from the player only act once every turns turns. Like idle
+        # entities, they are told how many turns they slept through with skip_turns.
+        if turns > 1 and entity in self.next_action and entity not in self.idle:
+            since = self.next_action[entity]
+            self.idle[entity] = (entity.ai, since)
+            self.dormant.setdefault(entity)
+            self.schedule(entity, since + (turns - 1) * self.action_cost(entity))
+
+    def get_dormant(self):
+        return list(self.dormant)